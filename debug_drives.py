@@ -1,74 +1,133 @@
 
 import subprocess
 import json
+import glob
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson parses multi-KB smartctl payloads several times faster, if installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# ATA attributes carrying drive temperature (194 Temperature_Celsius, 190 Airflow_Temperature)
+_TEMP_IDS = frozenset((190, 194))
+
+# Disks rarely change, so lsblk output is reused for DISK_CACHE_TTL seconds
+DISK_CACHE_TTL = 60
+_disk_cache = {'ts': 0, 'out': None}
+
+def list_disks():
+    """Return raw lsblk JSON output, cached for DISK_CACHE_TTL seconds"""
+    now = time.monotonic()
+    if _disk_cache['out'] is None or now - _disk_cache['ts'] > DISK_CACHE_TTL:
+        _disk_cache['out'] = subprocess.check_output(
+            ['lsblk', '-J', '-d', '-o', 'NAME,TYPE,SIZE,MODEL,SERIAL'],
+            stderr=subprocess.DEVNULL, text=True
+        )
+        _disk_cache['ts'] = now
+    return _disk_cache['out']
+
+# (threshold, divisor, suffix) checked top-down by format_size, same layout
+# as fancontrol.sensor_manager (not imported here: that would load the config)
+_SIZE_UNITS = (
+    (1000**4, 1000**4, 'TB'),
+    (1000**3, 1000**3, 'GB'),
+)
 
 def format_size(size_bytes):
     try:
         size_bytes = int(size_bytes)
-        if size_bytes >= 1000**4:
-            return f"{size_bytes / (1000**4):.1f} TB"
-        elif size_bytes >= 1000**3:
-            return f"{size_bytes / (1000**3):.1f} GB"
-        else:
-            return f"{size_bytes / (1024**3):.1f} GiB"
-    except:
+    except (TypeError, ValueError):
         return "?"
+    for threshold, divisor, suffix in _SIZE_UNITS:
+        if size_bytes >= threshold:
+            return f"{size_bytes / divisor:.1f} {suffix}"
+    return f"{size_bytes / 1024**3:.1f} GiB"
+
+def probe(name, dev_type):
+    """Probe a single device, returns (device_path, dev_type, status, temp)"""
+    device_path = f'/dev/{name}'
+    
+    if dev_type != 'disk':
+        return device_path, dev_type, "SKIPPED (Not a disk)", None
+    
+    # NVMe and drivetemp-backed SATA disks publish temperature in sysfs
+    for temp_input in glob.glob(f'/sys/block/{name}/device/hwmon/hwmon*/temp1_input'):
+        try:
+            with open(temp_input, 'r') as f:
+                temp = int(f.read().strip()) / 1000.0
+            return device_path, dev_type, f"OK (Temp: {temp:.0f}°C, sysfs)", temp
+        except (OSError, ValueError):
+            continue
+        
+    try:
+        # -A: attribute table only; -n standby: don't spin up sleeping disks
+        cmd = ['smartctl', '-j', '-A', '-n', 'standby', device_path]
+        try:
+            # Python opens fds non-inheritable, so the child's close-all-fds
+            # pass can be skipped safely
+            o = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=5,
+                                        close_fds=False)
+        except subprocess.CalledProcessError as e:
+            # Other bits are informational and stdout still holds the JSON
+            o = e.output
+            returncode = e.returncode
+        else:
+            returncode = 0
+        j = json_loads(o)
+        
+        # Bit 1 is set both for a standby skip and for a failed device open;
+        # only smartctl's message tells them apart
+        if returncode & 2:
+            messages = [m.get('string', '') for m in j.get('smartctl', {}).get('messages', ())]
+            if any('standby' in m.lower() for m in messages):
+                return device_path, dev_type, "SKIPPED (standby)", None
+            return device_path, dev_type, f"FAILED ({'; '.join(messages) or 'device open failed'})", None
+        
+        # Check temp
+        temp = j.get('temperature', {}).get('current')
+        if temp is None:
+            temp = next((a['raw']['value'] & 0xFF
+                         for a in j.get('ata_smart_attributes', {}).get('table', ())
+                         if a.get('id') in _TEMP_IDS), None)
+        
+        if temp is not None:
+            return device_path, dev_type, f"OK (Temp: {temp}°C)", temp
+        # Dump keys to see what's wrong
+        # print(f"Keys: {list(j.keys())}")
+        return device_path, dev_type, "SKIPPED (No temperature found)", None
+            
+    except Exception as e:
+        return device_path, dev_type, f"FAILED ({e})", None
 
 def debug_scan():
     print("--- 1. Running lsblk ---")
     try:
-        lsblk_out = subprocess.check_output(
-            ['lsblk', '-d', '-n', '-o', 'NAME,TYPE,SIZE,MODEL,SERIAL'],
-            stderr=subprocess.STDOUT
-        ).decode()
+        lsblk_out = list_disks()
         print(lsblk_out)
+        lsblk_data = json_loads(lsblk_out)
     except Exception as e:
         print(f"Error running lsblk: {e}")
         return
 
     print("\n--- 2. Parsing loop ---")
-    lines = lsblk_out.strip().split('\n')
-    found_count = 0
+    targets = [(d['name'], d['type']) for d in lsblk_data.get('blockdevices', [])]
     
-    for line in lines:
-        parts = line.split()
-        if len(parts) < 2:
-            continue
-            
-        name = parts[0]
-        dev_type = parts[1]
-        device_path = f'/dev/{name}'
-        
-        print(f"Checking {device_path} (Type: {dev_type})... ", end='')
-        
-        if dev_type != 'disk':
-            print("SKIPPED (Not a disk)")
-            continue
-            
-        try:
-            cmd = ['smartctl', '-j', '-a', device_path]
-            o = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=5)
-            j = json.loads(o)
-            
-            # Check temp
-            temp = j.get('temperature', {}).get('current')
-            if temp is None:
-                 for a in j.get('ata_smart_attributes', {}).get('table', []):
-                    if a['id'] in [194, 190]:
-                        temp = a['raw']['value'] & 0xFF
-                        break
-            
-            if temp is not None:
-                print(f"OK (Temp: {temp}°C)")
-                found_count += 1
-            else:
-                print("SKIPPED (No temperature found)")
-                # Dump keys to see what's wrong
-                # print(f"Keys: {list(j.keys())}")
-                
-        except Exception as e:
-            print(f"FAILED ({e})")
+    # Probe all disks at once: each smartctl call is I/O-bound on the drive,
+    # so a stalled disk only costs its own 5s timeout.
+    results = []
+    if targets:
+        with ThreadPoolExecutor(max_workers=min(len(targets), 16)) as ex:
+            results = list(ex.map(lambda t: probe(*t), targets))
+    
+    found_count = 0
+    for device_path, dev_type, status, temp in results:
+        print(f"Checking {device_path} (Type: {dev_type})... {status}")
+        if temp is not None:
+            found_count += 1
             
     print(f"\nTotal found with temperature: {found_count}")
 
@@ -5,15 +5,15 @@ import logging
 import signal
 import sys
 import os
-import json
 import signal
 import sys
 import os
+from collections import defaultdict
 
 # Ensure script directory is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from fancontrol import config, sensors, controllers, web, state_manager, sensor_manager
+from fancontrol import config, sensors, controllers, web, state_manager, sensor_manager, sysfs, gpu_scanner
 
 # Configure logging
 logging.basicConfig(
@@ -29,33 +29,62 @@ logger = logging.getLogger('FanControl')
 # Global run flag
 RUNNING = True
 
+# Main loop period in seconds, and the longer period used while nothing changes
+LOOP_INTERVAL = 2
+IDLE_LOOP_INTERVAL = 4
+
 def signal_handler(sig, frame):
     global RUNNING
     logger.info("Stopping fan control service...")
     RUNNING = False
 
+# Keys of failures already logged, so a persistent error is reported once
+_warned = set()
+
+def _warn_once(key, message):
+    if key not in _warned:
+        _warned.add(key)
+        logger.warning(message)
+
+# CPU temperature attribute, kept open across ticks
+_cpu_temp_attr = None
+
 def get_cpu_temp(cfg):
     """Get CPU temperature from configured path"""
+    global _cpu_temp_attr
     path = cfg.get('cpu_sensor_path')
     if not path:
         return 0
+    if _cpu_temp_attr is None or _cpu_temp_attr.path != path:
+        if _cpu_temp_attr is not None:
+            _cpu_temp_attr.close()
+        _cpu_temp_attr = sysfs.SysfsAttr(path)
     try:
-        with open(path, 'r') as f:
-            return int(f.read().strip()) / 1000.0
-    except:
+        temp = _cpu_temp_attr.read_int() / 1000.0
+    except (OSError, ValueError) as e:
+        _warn_once('cpu_temp', f"Cannot read CPU temperature from {path}: {e}")
         return 0
+    _warned.discard('cpu_temp')
+    return temp
 
-def get_max_temp_by_type(sensor_values, sensor_configs, s_type):
-    """Get max temperature for a given sensor type"""
-    temps = []
+def get_max_temp_by_type(sensor_values, sensor_ids):
+    """Get max temperature over the sensors of one type"""
+    return max((sensor_values[i] for i in sensor_ids if i in sensor_values), default=0)
+
+def build_sensor_index(sensor_configs):
+    """Index configured sensors: ({id: config}, {type: [ids]})"""
+    conf_by_id = {}
+    ids_by_type = defaultdict(list)
     for s in sensor_configs:
-        if s.get('type') == s_type:
-            val = sensor_values.get(s['id'])
-            if val is not None:
-                temps.append(val)
-    return max(temps) if temps else 0
+        conf_by_id.setdefault(s['id'], s)
+        ids_by_type[s.get('type')].append(s['id'])
+    return conf_by_id, ids_by_type
 
 def main():
+    # Package modules report via print(); under systemd stdout is a pipe and
+    # would be block-buffered, so flush per line instead of per 8 KiB
+    sys.stdout.reconfigure(line_buffering=True)
+    
     # Register signal handlers
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
@@ -67,22 +96,45 @@ def main():
     web_thread.start()
     logger.info("Web server started")
     
+    # Keep the NVIDIA driver loaded between the per-tick GPU queries
+    gpu_scanner.ensure_persistence_mode()
+    
     # Initialize controllers and state managers per group
     state_managers = {}
     fan_controllers = {}
     
+    # Legacy nvidia group fan maps: {gid: (gpu_config key, fans_list)}
+    synthesized_fans = {}
+    
+    # Sensor config lookups, rebuilt when config_revision changes
+    sensor_index_revision = None
+    
+    # Inputs of the previous tick, to detect steady state
+    last_state_key = None
+    
+    # Last history entry written, to skip logging unchanged states
+    last_history_key = None
+    last_history_time = 0
+    
+    # Deadline of the current tick (monotonic clock)
+    next_tick = time.monotonic()
+    
     # Main loop
     while RUNNING:
         try:
             # Reload config if needed (or just use current)
             # config.load_config() is called on import, but we might want to refresh dynamic overrides
-            cfg = config.current_config
+            revision, cfg, overrides = config.get_snapshot()
             if not cfg:
                 time.sleep(1)
+                next_tick = time.monotonic()
                 continue
             
             # 1. Read all sensors
             configured_sensors = cfg.get('sensors', [])
+            if sensor_index_revision != revision:
+                conf_by_id, ids_by_type = build_sensor_index(configured_sensors)
+                sensor_index_revision = revision
             # sensor_values is now {id: {'value': float, 'sources': [...]}}
             sensor_data_map = sensor_manager.get_all_sensor_values(configured_sensors)
             
@@ -91,8 +143,15 @@ def main():
             
             # Determine logic inputs
             cpu_temp = get_cpu_temp(cfg)
-            gpu_temp = get_max_temp_by_type(simple_sensor_values, configured_sensors, 'nvidia')
-            hdd_temp = get_max_temp_by_type(simple_sensor_values, configured_sensors, 'drive')
+            gpu_temp = get_max_temp_by_type(simple_sensor_values, ids_by_type['nvidia'])
+            hdd_temp = get_max_temp_by_type(simple_sensor_values, ids_by_type['drive'])
+            
+            # Inputs for all state managers: dedicated sensor values plus legacy
+            # aggregates. Built once per tick, AutoStateManager.update() only reads it.
+            logic_values = dict(simple_sensor_values, cpu=cpu_temp, gpu=gpu_temp, hdd=hdd_temp)
+            
+            # Set when a closed-loop controller is still outside its tolerance
+            adjusting = False
             
             # Initialize API data structure
             api_data = {
@@ -111,7 +170,7 @@ def main():
             # Populate sensors list dynamically
             for sensor_id, data in sensor_data_map.items():
                 # Find config for this sensor
-                conf = next((s for s in configured_sensors if s['id'] == sensor_id), {})
+                conf = conf_by_id.get(sensor_id, {})
                 api_data['sensors'].append({
                     'id': sensor_id,
                     'name': conf.get('name', sensor_id),
@@ -123,36 +182,32 @@ def main():
 
             # 2. Iterate Fan Groups
             fan_groups = cfg.get('fan_groups', [])
+            # nvidia-settings writes of all GPU fans go out together after the loop
+            controllers.gpu_batch.begin()
             for group in fan_groups:
                 gid = group['id']
                 
                 # Check runtime override
-                override = config.runtime_override.get(gid, {'enabled': False, 'mode': '0'})
+                override = overrides.get(gid, {'enabled': False, 'mode': '0'})
+                
+                # Legacy config is cached until the config is saved/reloaded
+                legacy_cfg = config.get_legacy_format(group)
                 
                 # Init State Manager if needed
                 if gid not in state_managers:
-                    legacy_cfg = config.profiles_to_legacy_format(group)
                     state_managers[gid] = state_manager.AutoStateManager(legacy_cfg)
                 
                 # Update State Manager
                 sm = state_managers[gid]
                 # Update config in case it changed
-                sm.config = config.profiles_to_legacy_format(group)
-                sm.mode_keys = sorted(sm.config['THRESHOLDS'].keys(), key=lambda x: int(x), reverse=True)
+                if sm.config is not legacy_cfg:
+                    sm.set_config(legacy_cfg)
                 
                 if override['enabled']:
                     current_mode = str(override['mode'])
                     sm.current_mode = current_mode
                     sm.status_msg = "MANUAL"
                 else:
-                    # Prepare all sensor values for logic
-                    # 1. Start with dedicated sensor values
-                    logic_values = simple_sensor_values.copy()
-                    # 2. Add legacy aggregate values for backward compatibility
-                    logic_values['cpu'] = cpu_temp
-                    logic_values['gpu'] = gpu_temp
-                    logic_values['hdd'] = hdd_temp
-                    
                     current_mode = sm.update(logic_values)
                 
 
@@ -170,14 +225,14 @@ def main():
                              # Not a valid index, treat as raw target
                              try:
                                 target = int(current_mode)
-                             except:
+                             except (TypeError, ValueError):
                                 target = 0
                              logger.info(f"Manual Mode: Group={gid}, Input={current_mode}, Raw Target={target}")
                     else:
                         # No profiles or non-digit mode, treat as raw
                         try:
                             target = int(current_mode)
-                        except:
+                        except (TypeError, ValueError):
                             target = 0
                         logger.info(f"Manual Mode: Group={gid}, Input={current_mode}, Raw Target={target}")
                 else:
@@ -199,19 +254,26 @@ def main():
                 fans_list = group.get('fans', [])
                 
                 # Compatibility: Synthesize legacy GPU group fans if empty list but type is nvidia
+                # (built once per gpu_config rather than every tick)
                 if group.get('type') == 'nvidia' and not fans_list:
                     gpu_cfg = group.get('gpu_config', {})
                     fan_indices = gpu_cfg.get('fans', [0, 1])
-                    fans_list = []
-                    for idx in fan_indices:
-                        fans_list.append({
-                            'fan_id': f"{gid}_fan_{idx}",
-                            'name': f"GPU Fan {idx}",
-                            'type': 'nvidia',
-                            'gpu_index': gpu_cfg.get('gpu_index', 0),
-                            'fan_index': idx,
-                            'display': gpu_cfg.get('display', ':0')
-                        })
+                    synth_key = (gpu_cfg.get('gpu_index', 0), tuple(fan_indices), gpu_cfg.get('display', ':0'))
+                    cached = synthesized_fans.get(gid)
+                    if cached and cached[0] == synth_key:
+                        fans_list = cached[1]
+                    else:
+                        fans_list = []
+                        for idx in fan_indices:
+                            fans_list.append({
+                                'fan_id': f"{gid}_fan_{idx}",
+                                'name': f"GPU Fan {idx}",
+                                'type': 'nvidia',
+                                'gpu_index': gpu_cfg.get('gpu_index', 0),
+                                'fan_index': idx,
+                                'display': gpu_cfg.get('display', ':0')
+                            })
+                        synthesized_fans[gid] = (synth_key, fans_list)
 
                 for fan_map in fans_list:
                     fid = fan_map['fan_id']
@@ -251,6 +313,9 @@ def main():
                             fan_data['rpm'] = current_rpm
                             fan_data['pwmOrPct'] = ctrl.current_pct
                             
+                            # The controller's own band, so the loop doesn't idle while it still steps
+                            adjusting = adjusting or not ctrl.settled()
+                            
                             # Status check (User requested +/- 50 tolerance)
                             if abs(target - current_rpm) > 50:
                                 fan_data['status'] = 'ADJ'
@@ -294,6 +359,8 @@ def main():
                         fan_data['rpm'] = ctrl.current_rpm
                         fan_data['pwmOrPct'] = ctrl.current_pwm
                         
+                        adjusting = adjusting or not ctrl.settled()
+                        
                         # Status check for System Fans
                         # Using 50 RPM tolerance to match UI expectations
                         if abs(ctrl.target_rpm - ctrl.current_rpm) > 50:
@@ -303,21 +370,57 @@ def main():
                     
                     api_data['fans'].append(fan_data)
 
+            controllers.gpu_batch.flush()
+            
             # Update shared state for API
-            with web.current_state['lock']:
-                web.current_state['data'] = api_data
-
-            # Log history
-            try:
-                web.history_logger.info(json.dumps(api_data))
-            except:
-                pass
+            status_body = web.publish_status(api_data)
+            
+            state_key = (
+                tuple(sorted((k, round(v, 1)) for k, v in simple_sensor_values.items())),
+                round(cpu_temp, 1),
+                tuple(sorted((gid, o['enabled'], o['mode']) for gid, o in overrides.items()))
+            )
             
-            time.sleep(2)
+            # Log history (reuses the JSON serialized for /api/status, written off-thread).
+            # Unchanged states are logged at most every LOG_INTERVAL seconds.
+            history_key = (
+                state_key,
+                tuple((gid, l['mode'], l['target'], l['status']) for gid, l in api_data['logic'].items()),
+                tuple((f['id'], f['status']) for f in api_data['fans'])
+            )
+            now = api_data['timestamp']
+            if history_key != last_history_key or now - last_history_time >= web.LOG_INTERVAL:
+                web.log_history(status_body)
+                web.record_history(api_data)
+                last_history_key = history_key
+                last_history_time = now
+            
+            # Back off while inputs are unchanged and everything has settled.
+            # Pending escalations keep the normal period so DELAY_UP stays accurate.
+            idle = (
+                state_key == last_state_key
+                and all(sm.pending_mode is None for sm in state_managers.values())
+                and not adjusting
+            )
+            last_state_key = state_key
+            
+            # Sleep until the next deadline so the period doesn't drift by the tick's own work
+            interval = IDLE_LOOP_INTERVAL if idle else LOOP_INTERVAL
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -interval:
+                # More than a period behind (e.g. a stalled tick), resync instead of bursting
+                next_tick = time.monotonic()
             
         except Exception as e:
             logger.error(f"Error in main loop: {e}", exc_info=True)
             time.sleep(5)
+            next_tick = time.monotonic()
+    
+    # Don't lose a debounced config save on shutdown/restart
+    config.flush_config()
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { fetchSystemData, fetchHistory } from './services/apiService';
+import { fetchSystemData, fetchHistory, subscribeSystemData } from './services/apiService';
 import { SystemData, ChartDataPoint, TimeRange } from './types';
 import {
   Cpu,
@@ -26,6 +26,8 @@ export default function App() {
 
 
   useEffect(() => {
+    let interval: ReturnType<typeof setInterval> | undefined;
+
     const fetchData = async () => {
       try {
         const result = await fetchSystemData();
@@ -35,9 +37,17 @@ export default function App() {
       }
     };
 
-    fetchData();
-    const interval = setInterval(fetchData, 1000);
-    return () => clearInterval(interval);
+    // Status is pushed by the daemon; fall back to polling if the stream fails
+    const unsubscribe = subscribeSystemData(setData, () => {
+      if (interval) return;
+      fetchData();
+      interval = setInterval(fetchData, 1000);
+    });
+
+    return () => {
+      unsubscribe();
+      if (interval) clearInterval(interval);
+    };
   }, []);
 
   // Load configured drives on mount
@@ -8,6 +8,21 @@ export const fetchSystemData = async (): Promise<SystemData> => {
     return res.json();
 };
 
+// Pushed status updates (Server-Sent Events). onError fires once if the
+// stream can't be used; the returned function closes the stream.
+export const subscribeSystemData = (
+    onData: (data: SystemData) => void,
+    onError: () => void
+): (() => void) => {
+    const source = new EventSource(`${API_BASE}/api/status/stream`);
+    source.onmessage = (event) => onData(JSON.parse(event.data));
+    source.onerror = () => {
+        source.close();
+        onError();
+    };
+    return () => source.close();
+};
+
 export const fetchHistory = async (range: TimeRange = '30m'): Promise<ChartDataPoint[]> => {
     const res = await fetch(`${API_BASE}/api/history?range=${range}`);
     if (!res.ok) return [];
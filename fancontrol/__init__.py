@@ -5,16 +5,9 @@ Modular fan control system for system and GPU fan management.
 Now uses dynamic fan_groups for flexible configuration.
 """
 
+import importlib
+
 from . import config
-from . import drives
-from . import sensors
-from . import controllers
-from . import state_manager
-from . import web
-from . import fan_scanner
-from . import gpu_scanner
-from . import cpu_scanner
-from . import sensor_manager
 
 # Re-export commonly used items
 from .config import (
@@ -23,21 +16,61 @@ from .config import (
     DEFAULT_CONFIG,
     load_config,
     save_config,
+    flush_config,
     get_current_config,
+    get_snapshot,
     get_group_by_id,
     get_system_groups,
     get_nvidia_group,
     add_fan_group,
     remove_fan_group,
-    profiles_to_legacy_format
+    profiles_to_legacy_format,
+    get_legacy_format
+)
+
+# Other submodules and their re-exports are imported on first access (PEP 562),
+# so tools that only need config don't start scanners or open the history log
+_SUBMODULES = (
+    'drives', 'sensors', 'controllers', 'state_manager', 'web',
+    'fan_scanner', 'gpu_scanner', 'cpu_scanner', 'sensor_manager'
 )
 
-from .drives import scan_all_drives, get_configured_drives
-from .sensors import get_vals, get_it8613_path
-from .controllers import SystemFanController, GPUFanController, TOLERANCE, PWM_MIN, PWM_MAX, STEP_SIZE
-from .state_manager import AutoStateManager
-from .web import start_http_server, current_state, history_logger, LOG_INTERVAL
-from .fan_scanner import scan_all, test_pwm
+_LAZY_EXPORTS = {
+    'scan_all_drives': 'drives',
+    'get_configured_drives': 'drives',
+    'get_vals': 'sensors',
+    'get_it8613_path': 'sensors',
+    'SystemFanController': 'controllers',
+    'GPUFanController': 'controllers',
+    'TOLERANCE': 'controllers',
+    'PWM_MIN': 'controllers',
+    'PWM_MAX': 'controllers',
+    'STEP_SIZE': 'controllers',
+    'AutoStateManager': 'state_manager',
+    'start_http_server': 'web',
+    'current_state': 'web',
+    'history_logger': 'web',
+    'LOG_INTERVAL': 'web',
+    'scan_all': 'fan_scanner',
+    'test_pwm': 'fan_scanner',
+}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    elif name in _LAZY_EXPORTS:
+        module = importlib.import_module(f'.{_LAZY_EXPORTS[name]}', __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES) | set(_LAZY_EXPORTS))
+
 
 # Load config on package import
 load_config()
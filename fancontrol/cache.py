@@ -0,0 +1,38 @@
+"""
+Cache Module
+
+Time-limited memoization for hardware scans that fork nvidia-smi,
+nvidia-settings or smartctl and may be requested repeatedly by the web UI.
+"""
+import threading
+import time
+from functools import wraps
+
+
+def ttl_cache(seconds: float):
+    """
+    Reuse a function's result for `seconds` per positional-argument tuple.
+    Concurrent callers wait for one computation instead of each running it.
+    The cached object is shared, so callers must not modify it.
+    Call func.cache_clear() to force the next call to recompute.
+    """
+    def decorator(func):
+        entries = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args):
+            entry = entries.get(args)
+            if entry is not None and time.monotonic() - entry[0] < seconds:
+                return entry[1]
+            with lock:
+                entry = entries.get(args)
+                if entry is not None and time.monotonic() - entry[0] < seconds:
+                    return entry[1]
+                result = func(*args)
+                entries[args] = (time.monotonic(), result)
+            return result
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+    return decorator
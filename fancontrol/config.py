@@ -4,11 +4,26 @@ Fan Control Configuration Module
 Handles configuration loading, saving, migration, and format conversion.
 Now supports dynamic fan_groups for flexible configuration.
 """
+import copy
 import json
+import os
+import threading
+import time
+from functools import wraps
 from pathlib import Path
 
+from . import fastjson
+
 # --- CONFIG FILE PATH ---
-CONFIG_FILE = Path(__file__).parent.parent / 'fan_config.json'
+# FAN_CONTROL_CONFIG overrides the location (e.g. for tests)
+CONFIG_FILE = Path(os.environ.get('FAN_CONTROL_CONFIG',
+                                  Path(__file__).parent.parent / 'fan_config.json'))
+
+# Seconds to coalesce rapid save_config() calls into one file write
+SAVE_DEBOUNCE = 0.5
+
+# Fields persisted to CONFIG_FILE; anything else is API-only
+CORE_FIELDS = ['fan_groups', 'override', 'drives', 'sensors', 'cpu_sensor_path', 'hdd_poll_interval']
 
 # Runtime override state (keyed by group_id)
 runtime_override = {}
@@ -16,6 +31,20 @@ runtime_override = {}
 # Current config in profile format (for API)
 current_config = None
 
+# Bumped whenever current_config is replaced, to invalidate derived caches
+config_revision = 0
+
+# Guards replacing current_config/runtime_override against get_snapshot()
+_lock = threading.RLock()
+
+
+def _locked(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _lock:
+            return func(*args, **kwargs)
+    return wrapper
+
 # --- DEFAULT CONFIG (empty - user configures everything via UI) ---
 DEFAULT_CONFIG = {
     'fan_groups': [],  # Empty - user adds groups via wizard
@@ -124,10 +153,63 @@ def profiles_to_legacy_format(group):
     }
 
 
+# {id(group): (group, legacy_cfg)} for the current config_revision
+_legacy_cache = {}
+_legacy_cache_revision = None
+
+
+def get_legacy_format(group):
+    """
+    Cached profiles_to_legacy_format().
+    Returns the same dict object until the config is saved or reloaded.
+    """
+    global _legacy_cache, _legacy_cache_revision
+    if _legacy_cache_revision != config_revision:
+        _legacy_cache = {}
+        _legacy_cache_revision = config_revision
+    
+    entry = _legacy_cache.get(id(group))
+    if entry is None or entry[0] is not group:
+        entry = (group, profiles_to_legacy_format(group))
+        _legacy_cache[id(group)] = entry
+    return entry[1]
+
+
+# (config_revision, frozenset of group ids, {sensor id: position in 'sensors'})
+_index = (None, frozenset(), {})
+
+
+def _get_index():
+    """Id lookups for the current config, rebuilt once per config_revision"""
+    global _index
+    index = _index
+    if index[0] != config_revision:
+        cfg = current_config or {}
+        index = (
+            config_revision,
+            frozenset(g['id'] for g in cfg.get('fan_groups', [])),
+            {s['id']: i for i, s in enumerate(cfg.get('sensors', []))}
+        )
+        _index = index
+    return index
+
+
+def valid_group_ids():
+    """Ids of all configured fan groups"""
+    return _get_index()[1]
+
+
+def sensor_index():
+    """{sensor id: position in current_config['sensors']}"""
+    return _get_index()[2]
+
+
+@_locked
 def load_config():
     """Load config from JSON file or use defaults"""
-    global runtime_override, current_config
+    global runtime_override, current_config, config_revision
     
+    config_revision += 1
     if CONFIG_FILE.exists():
         try:
             with open(CONFIG_FILE, 'r') as f:
@@ -141,8 +223,8 @@ def load_config():
             if needs_migration:
                 print("Migrating config to new fan_groups format...")
                 cfg = migrate_old_config(cfg)
-                with open(CONFIG_FILE, 'w') as f:
-                    json.dump(cfg, f, indent=2, ensure_ascii=False)
+                current_config = cfg
+                _write_config()
                 print("Config migrated and saved.")
             
             current_config = cfg
@@ -166,7 +248,7 @@ def load_config():
     else:
         current_config = DEFAULT_CONFIG.copy()
         _init_runtime_override()
-        save_config(current_config)
+        _write_config()
         print(f"Created default config at {CONFIG_FILE}")
 
 
@@ -183,14 +265,59 @@ def _init_runtime_override():
         }
 
 
+_save_pending = threading.Event()
+_save_lock = threading.Lock()
+_save_thread = None
+
+
+def _write_config():
+    """Atomically write the core fields of current_config to CONFIG_FILE"""
+    with _save_lock:
+        # Filter out legacy fields that are added by get_current_config for API compatibility
+        config_to_save = {k: v for k, v in current_config.items() if k in CORE_FIELDS}
+        data = fastjson.dumps_indented(config_to_save)
+        
+        tmp_file = CONFIG_FILE.with_name(CONFIG_FILE.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            # Data must be on disk before the rename, or a crash can leave an empty file
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, CONFIG_FILE)
+
+
+def _save_worker():
+    while True:
+        _save_pending.wait()
+        time.sleep(SAVE_DEBOUNCE)
+        _save_pending.clear()
+        try:
+            _write_config()
+        except Exception as e:
+            print(f"Error saving config: {e}")
+
+
+def flush_config():
+    """Write a pending debounced save immediately (call before exit)"""
+    if _save_pending.is_set():
+        _save_pending.clear()
+        _write_config()
+
+
+@_locked
 def save_config(config=None):
-    """Save current config to JSON file"""
-    global current_config, runtime_override
+    """
+    Update current config and schedule a save to the JSON file.
+    Writes are debounced by SAVE_DEBOUNCE seconds on a background thread.
+    """
+    global current_config, runtime_override, config_revision, _save_thread
     
     if config is None:
-        config = current_config if current_config else DEFAULT_CONFIG
+        # Replace rather than re-publish the same dict (see update_config)
+        config = copy.deepcopy(current_config if current_config else DEFAULT_CONFIG)
     
     current_config = config
+    config_revision += 1
     
     # Sync runtime override
     if 'override' in config:
@@ -200,72 +327,98 @@ def save_config(config=None):
                 'mode': str(ovr.get('mode', 0))
             }
     
-    # Filter out legacy fields that are added by get_current_config for API compatibility
-    # Only save core config fields
-    core_fields = ['fan_groups', 'override', 'drives', 'sensors', 'cpu_sensor_path']
-    config_to_save = {k: v for k, v in config.items() if k in core_fields}
-    
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config_to_save, f, indent=2, ensure_ascii=False)
+    if _save_thread is None:
+        _save_thread = threading.Thread(target=_save_worker, daemon=True)
+        _save_thread.start()
+    _save_pending.set()
+
+
+@_locked
+def update_config(change):
+    """
+    Read-modify-save the config as one step with respect to other writers.
+    change(cfg) edits a private deep copy of get_current_config() and may
+    raise to abort without saving; its return value is passed through.
+    The edited copy replaces current_config, so a dict already handed out
+    (e.g. by get_snapshot()) never changes underneath its reader.
+    """
+    cfg = copy.deepcopy(get_current_config())
+    result = change(cfg)
+    save_config(cfg)
+    return result
+
+
+@_locked
+def set_override(group_id, enabled, mode=None, save=False):
+    """
+    Change a group's runtime override; save=True also persists it.
+    The entry is replaced whole, so the control loop never sees a new
+    'enabled' with the old 'mode'.
+    """
+    ovr = dict(runtime_override.get(group_id, {'enabled': False, 'mode': '0'}))
+    ovr['enabled'] = enabled
+    if mode is not None:
+        ovr['mode'] = str(mode)
+    runtime_override[group_id] = ovr
+    if save:
+        # The copy's 'override' is built from runtime_override
+        update_config(lambda cfg: None)
+    return ovr
 
 
 def add_fan_group(group):
     """Add a new fan group to the config"""
-    global current_config
-    
-    if current_config is None:
-        current_config = DEFAULT_CONFIG.copy()
-    
-    if 'fan_groups' not in current_config:
-        current_config['fan_groups'] = []
-    
-    # Check for duplicate ID
-    existing_ids = [g['id'] for g in current_config['fan_groups']]
-    if group['id'] in existing_ids:
-        raise ValueError(f"Group with ID '{group['id']}' already exists")
+    def change(cfg):
+        # Check for duplicate ID
+        if any(g['id'] == group['id'] for g in cfg.get('fan_groups', [])):
+            raise ValueError(f"Group with ID '{group['id']}' already exists")
+        cfg.setdefault('fan_groups', []).append(group)
+        # Initialize override for this group
+        cfg.setdefault('override', {})[group['id']] = {'enabled': False, 'mode': 0}
     
-    current_config['fan_groups'].append(group)
-    
-    # Initialize override for this group
-    if 'override' not in current_config:
-        current_config['override'] = {}
-    current_config['override'][group['id']] = {'enabled': False, 'mode': 0}
-    runtime_override[group['id']] = {'enabled': False, 'mode': '0'}
-    
-    save_config()
+    update_config(change)
     return group
 
 
+@_locked
 def remove_fan_group(group_id):
     """Remove a fan group from the config"""
-    global current_config
-    
     if current_config is None:
         return False
     
     # Don't allow removing nvidia group
     group = get_group_by_id(current_config, group_id)
-    if group and group.get('type') == 'nvidia':
+    if group is None:
+        return False
+    if group.get('type') == 'nvidia':
         raise ValueError("Cannot remove built-in GPU group")
     
-    original_len = len(current_config.get('fan_groups', []))
-    current_config['fan_groups'] = [g for g in current_config.get('fan_groups', []) if g['id'] != group_id]
+    def change(cfg):
+        cfg['fan_groups'] = [g for g in cfg.get('fan_groups', []) if g['id'] != group_id]
+        cfg.get('override', {}).pop(group_id, None)
     
-    # Remove override
-    if 'override' in current_config and group_id in current_config['override']:
-        del current_config['override'][group_id]
-    if group_id in runtime_override:
-        del runtime_override[group_id]
-    
-    if len(current_config['fan_groups']) < original_len:
-        save_config()
-        return True
-    return False
+    update_config(change)
+    runtime_override.pop(group_id, None)
+    return True
+
 
+def get_snapshot():
+    """
+    Consistent view for one control tick:
+    (config_revision, current_config, copy of runtime_override)
+    current_config is never edited in place, every change installs a new
+    dict, so the returned one stays unchanged while the tick uses it.
+    """
+    with _lock:
+        return config_revision, current_config, dict(runtime_override)
 
+
+@_locked
 def get_current_config():
-    """Get current config as dict for API - includes legacy system/gpu fields for compatibility"""
-    global current_config
+    """
+    Get current config as dict for API - includes legacy system/gpu fields for compatibility.
+    A shallow copy: use update_config() to change it.
+    """
     if current_config is None:
         return DEFAULT_CONFIG
     
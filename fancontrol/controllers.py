@@ -4,15 +4,62 @@ Fan Controllers Module
 Contains SystemFanController for PWM-controlled system fans 
 and GPUFanController for NVIDIA GPU fans.
 """
+import os
 import subprocess
 import time
 
+from . import nvml
+from . import spawn
+from .sysfs import SysfsAttr
+
 # Fan control constants
 TOLERANCE = 30
 PWM_MIN = 0
 PWM_MAX = 255
 STEP_SIZE = 2
 
+# Seconds before a system fan whose sysfs access failed is tried again
+SYSFS_RETRY_INTERVAL = 30
+
+# GPU fans step in whole percents, so they settle within a wider RPM band
+GPU_TOLERANCE = 50
+
+# Seconds after which an unchanged GPU fan speed is written again
+GPU_REASSERT_INTERVAL = 30
+
+
+class FanCurve:
+    """
+    Learned output (PWM or %) -> RPM map of a fan, recorded at points where
+    the fan had settled on its target. Lets a controller jump close to a new
+    target in one write instead of stepping there over many ticks.
+    """
+    
+    def __init__(self):
+        self.points = {}
+    
+    def record(self, output, rpm):
+        if rpm > 0:
+            self.points[int(output)] = rpm
+    
+    def estimate(self, target_rpm):
+        """Output expected to give target_rpm, or None without enough data"""
+        points = sorted(self.points.items())
+        if len(points) < 2:
+            return None
+        # Interpolate on the first segment reaching the target
+        # (extrapolate from the end segments outside the learned range)
+        i = 1
+        while i < len(points) - 1 and points[i][1] < target_rpm:
+            i += 1
+        (o0, r0), (o1, r1) = points[i - 1], points[i]
+        if r1 == r0:
+            return None
+        estimate = round(o0 + (target_rpm - r0) * (o1 - o0) / (r1 - r0))
+        # Unbounded extrapolation could land at 0 and stall the fan; stay within
+        # the learned outputs and let the step loop cover the rest
+        return max(points[0][0], min(points[-1][0], estimate))
+
 
 class SystemFanController:
     """Controller for system fans via sysfs PWM interface"""
@@ -21,47 +68,95 @@ class SystemFanController:
         self.name = name
         self.pwm_path = pwm_path
         self.fan_input_path = fan_input_path
+        # Kept open across ticks, see sysfs.SysfsAttr
+        self.pwm_attr = SysfsAttr(pwm_path, writable=True) if pwm_path else None
+        self.rpm_attr = SysfsAttr(fan_input_path) if fan_input_path else None
+        # After a sysfs error the fan is skipped until retry_at instead of
+        # failing (and raising) on every tick
+        self.healthy = True
+        self.retry_at = 0
+        if pwm_path and not os.path.exists(pwm_path):
+            self._mark_failed('open PWM', f'{pwm_path} not found')
         self.current_pwm = self.get_initial_pwm()
         self.current_rpm = 0
         self.target_rpm = 1200
+        self.curve = FanCurve()
+        self.curve_target = None
         self.enable_manual_control()
 
+    def _mark_failed(self, action, error):
+        if self.healthy:
+            print(f"Fan '{self.name}': {action} failed ({error}), retrying every {SYSFS_RETRY_INTERVAL}s")
+        self.healthy = False
+        self.retry_at = time.monotonic() + SYSFS_RETRY_INTERVAL
+
+    def _mark_ok(self):
+        if not self.healthy:
+            print(f"Fan '{self.name}': recovered")
+            self.healthy = True
+
+    def _skip(self):
+        """True while a failed fan is waiting for its next retry"""
+        return not self.healthy and time.monotonic() < self.retry_at
+
     def get_initial_pwm(self):
-        if not self.pwm_path:
+        if not self.pwm_attr or self._skip():
             return 128
         try:
-            with open(self.pwm_path, 'r') as f:
-                return int(f.read().strip())
-        except:
+            return self.pwm_attr.read_int()
+        except (OSError, ValueError) as e:
+            self._mark_failed('read PWM', e)
             return 128
 
     def enable_manual_control(self):
+        if not self.pwm_path or self._skip():
+            return
         try:
             with open(self.pwm_path + "_enable", 'w') as f:
                 f.write('1')
-        except:
+        except OSError:
             pass
 
     def get_rpm(self):
+        if not self.rpm_attr or self._skip():
+            return 0
         try:
-            with open(self.fan_input_path, 'r') as f:
-                return int(f.read().strip())
-        except:
+            rpm = self.rpm_attr.read_int()
+        except (OSError, ValueError) as e:
+            self._mark_failed('read RPM', e)
             return 0
+        self._mark_ok()
+        return rpm
 
     def set_pwm(self, val):
         val = max(PWM_MIN, min(PWM_MAX, int(val)))
+        if not self.pwm_attr or self._skip():
+            return
         try:
-            with open(self.pwm_path, 'w') as f:
-                f.write(str(val))
-            self.current_pwm = val
-        except:
-            pass
+            self.pwm_attr.write(val)
+        except OSError as e:
+            self._mark_failed('write PWM', e)
+            return
+        self._mark_ok()
+        self.current_pwm = val
+
+    def settled(self):
+        """Whether the last measured RPM is within TOLERANCE of the target"""
+        return abs(self.target_rpm - self.current_rpm) <= TOLERANCE
 
     def update(self):
         self.current_rpm = self.get_rpm()
+        
+        # New target: jump to the PWM learned for it, then fine-tune by steps
+        if self.target_rpm != self.curve_target:
+            self.curve_target = self.target_rpm
+            estimate = self.curve.estimate(self.target_rpm) if self.target_rpm > 0 else None
+            if estimate is not None:
+                self.set_pwm(estimate)
+                return
+        
         error = self.target_rpm - self.current_rpm
-        if abs(error) > TOLERANCE:
+        if not self.settled():
             step = STEP_SIZE
             if abs(error) > 200:
                 step *= 2
@@ -70,6 +165,53 @@ class SystemFanController:
             else:
                 self.current_pwm -= step
             self.set_pwm(self.current_pwm)
+        else:
+            self.curve.record(self.current_pwm, self.current_rpm)
+
+
+class GPUCommandBatch:
+    """
+    Collects nvidia-settings assignments from all GPU fan controllers during
+    a control tick and runs them as one nvidia-settings call per X display,
+    instead of one fork per fan. Outside begin()/flush() commands run at once.
+    """
+    
+    def __init__(self):
+        self.active = False
+        self.pending = {}  # display -> [assignment, ...]
+    
+    def begin(self):
+        # Anything left over from an interrupted tick is sent first
+        self.flush()
+        self.active = True
+    
+    def run(self, display, assignments):
+        if not self.active:
+            self._send(display, assignments)
+            return
+        queued = self.pending.setdefault(display, [])
+        for assignment in assignments:
+            if assignment not in queued:
+                queued.append(assignment)
+    
+    def flush(self):
+        self.active = False
+        pending, self.pending = self.pending, {}
+        for display, assignments in pending.items():
+            self._send(display, assignments)
+    
+    @staticmethod
+    def _send(display, assignments):
+        cmd = ['nvidia-settings', '-c', display]
+        for assignment in assignments:
+            cmd.extend(['-a', assignment])
+        try:
+            spawn.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Error running nvidia-settings: {e}")
+
+
+gpu_batch = GPUCommandBatch()
 
 
 class GPUFanController:
@@ -97,17 +239,29 @@ class GPUFanController:
         self.current_rpm = 0
         self.actual_pct = 0
         self.is_manual_active = False
-        self.reset()
+        # Speed last sent to the driver and when (current_pct is changed by
+        # update() before it calls set_speed_pct, so it can't be compared)
+        self.written_pct = None
+        self.last_write_time = 0
+        self.curve = FanCurve()
+        self.curve_target = None
+        # The GPU may have been left in manual mode (e.g. by a previous run)
+        self.reset(force=True)
 
-    def reset(self):
+    def reset(self, force=False):
         """Forces GPU back to Driver/Auto Control"""
+        if (not force and not self.is_manual_active
+                and time.monotonic() - self.last_write_time < GPU_REASSERT_INTERVAL):
+            # Already in auto, don't fork nvidia-settings on every idle tick.
+            # Still re-asserted every GPU_REASSERT_INTERVAL, since other tools
+            # (e.g. /api/gpu/test) can switch the fans to manual behind our back.
+            return
         try:
-            subprocess.run(
-                ['nvidia-settings', '-c', self.display, '-a', 
-                 f'[gpu:{self.gpu_index}]/GPUFanControlState=0'],
-                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-            )
+            if not nvml.set_default_fan_speed(self.gpu_index, self.fan_indices):
+                gpu_batch.run(self.display, [f'[gpu:{self.gpu_index}]/GPUFanControlState=0'])
             self.is_manual_active = False
+            self.written_pct = None
+            self.last_write_time = time.monotonic()
             self.current_pct = 0  # Reset so next set_target will reapply
         except:
             pass
@@ -124,29 +278,37 @@ class GPUFanController:
             # Sync start point before enabling manual
             if self.actual_pct > 0:
                 self.current_pct = self.actual_pct
+        elif (target_pct == self.written_pct
+              and time.monotonic() - self.last_write_time < GPU_REASSERT_INTERVAL):
+            # Already applied recently, skip the nvidia-settings fork
+            return
 
-        # Force Enable Manual Control EVERY TIME to ensure it sticks
-        # Some drivers/cards might silently revert or need re-assertion
-        subprocess.run(
-            ['nvidia-settings', '-c', self.display, '-a', 
-                f'[gpu:{self.gpu_index}]/GPUFanControlState=1'],
-            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-        self.is_manual_active = True
-        
-        # Build command with all configured fans
-        cmd = ['nvidia-settings', '-c', self.display]
-        for fan_idx in self.fan_indices:
-            cmd.extend(['-a', f'[fan:{fan_idx}]/GPUTargetFanSpeed={target_pct}'])
-        
         # Log the change for debugging
         print(f"DEBUG: GPU Fan Setting {target_pct}%")
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        # NVML sets the speed in-process (and implies manual control);
+        # otherwise fall back to nvidia-settings
+        if not nvml.set_fan_speed(self.gpu_index, self.fan_indices, target_pct):
+            # Enable manual control and set all configured fans in one invocation
+            # (batched with other controllers' writes during a control tick).
+            # Manual mode is re-asserted on every write since some drivers/cards
+            # silently revert to auto.
+            assignments = [f'[gpu:{self.gpu_index}]/GPUFanControlState=1']
+            for fan_idx in self.fan_indices:
+                assignments.append(f'[fan:{fan_idx}]/GPUTargetFanSpeed={target_pct}')
+            gpu_batch.run(self.display, assignments)
+        self.is_manual_active = True
         self.current_pct = target_pct
+        self.written_pct = target_pct
+        self.last_write_time = time.monotonic()
 
     def set_target_rpm(self, rpm):
         self.target_rpm = int(rpm)
 
+    def settled(self):
+        """Whether the last measured RPM is within GPU_TOLERANCE of the target"""
+        return abs(self.target_rpm - self.current_rpm) <= GPU_TOLERANCE
+
     def set_pwm(self, val):
         """Standard interface: sets speed from pseudo-PWM (0-255)"""
         # Convert 0-255 to 0-100%
@@ -186,10 +348,18 @@ class GPUFanController:
             
         # If target RPM is set, use closed-loop control
         if self.target_rpm > 100: # Ignore small values, treat as 0 or manual %
+             # New target: jump to the speed learned for it, then fine-tune by steps
+             if self.target_rpm != self.curve_target:
+                 self.curve_target = self.target_rpm
+                 estimate = self.curve.estimate(self.target_rpm)
+                 if estimate is not None:
+                     self.current_pct = max(20, min(100, estimate))
+                     self.set_speed_pct(self.current_pct)
+                     return
+             
              error = self.target_rpm - self.current_rpm
              
-             # Tolerance +/- 50 RPM
-             if abs(error) > 50:
+             if not self.settled():
                  # Calculate step
                  # If we are far off (>400 rpm), take bigger step
                  step = 1
@@ -207,6 +377,8 @@ class GPUFanController:
                  self.current_pct = max(20, min(100, self.current_pct))
                      
                  self.set_speed_pct(self.current_pct)
+             elif self.is_manual_active:
+                 self.curve.record(self.current_pct, self.current_rpm)
         
         # If target RPM is 0 but we have a manual % set via other means, just keep it.
         # But if we want to support "Auto" mode (target=0), we should check that.
@@ -4,10 +4,11 @@ CPU Temperature Sensor Scanner Module
 Scans for temperature sensors in /sys/class/hwmon.
 Provides functions for discovering and reading CPU temperature sensors.
 """
-import glob
 import os
 from typing import List, Dict, Optional
 
+from .sysfs import SysfsAttr, HWMON_ROOT, list_entries
+
 
 def scan_temp_sensors() -> List[Dict]:
     """
@@ -25,7 +26,7 @@ def scan_temp_sensors() -> List[Dict]:
     """
     sensors = []
     
-    for hwmon_path in sorted(glob.glob('/sys/class/hwmon/hwmon*')):
+    for hwmon_path in list_entries(HWMON_ROOT, 'hwmon'):
         hwmon_name = os.path.basename(hwmon_path)
         
         # Get chip name
@@ -37,8 +38,9 @@ def scan_temp_sensors() -> List[Dict]:
             continue
         
         # Find all temperature inputs
-        for temp_input in sorted(glob.glob(os.path.join(hwmon_path, 'temp*_input'))):
-            temp_id = os.path.basename(temp_input).replace('_input', '')
+        for temp_input in list_entries(hwmon_path, 'temp', '_input'):
+            base = temp_input[:-6]  # strip '_input'
+            temp_id = os.path.basename(base)
             
             # Read current value
             value = 0.0
@@ -50,7 +52,7 @@ def scan_temp_sensors() -> List[Dict]:
             
             # Try to read label
             label = ''
-            label_path = temp_input.replace('_input', '_label')
+            label_path = base + '_label'
             try:
                 with open(label_path, 'r') as f:
                     label = f.read().strip()
@@ -139,12 +141,18 @@ def auto_detect_cpu_sensor() -> Optional[str]:
     return None
 
 
+# Sensor inputs read via read_temp(), kept open across calls
+_temp_attrs = {}
+
+
 def read_temp(path: str) -> float:
     """Read temperature from a sensor path."""
+    attr = _temp_attrs.get(path)
+    if attr is None:
+        attr = _temp_attrs[path] = SysfsAttr(path)
     try:
-        with open(path, 'r') as f:
-            return int(f.read().strip()) / 1000.0
-    except:
+        return attr.read_int() / 1000.0
+    except (OSError, ValueError):
         return 0.0
 
 
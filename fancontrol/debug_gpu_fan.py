@@ -0,0 +1,163 @@
+"""
+GPU Fan Debugger
+
+Interactive tool for testing NVIDIA fan control.
+Run from the project root: python3 -m fancontrol.debug_gpu_fan
+"""
+import time
+import sys
+import subprocess
+import select
+
+from . import gpu_scanner
+from . import nvml
+
+# Fan indices here are nvidia-settings [fan:N] indices, numbered across all
+# GPUs; fancontrol.nvml maps them to its per-GPU fan numbers and falls back
+# to nvidia-settings (through gpu_scanner) when NVML is unavailable
+
+def get_gpu_fan_state(gpu_index=0, fan_index=0):
+    try:
+        res = gpu_scanner.get_gpu_fan_speeds(gpu_index, ':0', [fan_index])
+        return res.get(fan_index, {})
+    except Exception as e:
+        print(f"Error reading state: {e}")
+        return {}
+
+def get_all_fan_states(gpus=None):
+    """
+    Read every fan of every GPU in one sweep (one query per GPU).
+    Returns: {(gpu_index, fan_index): {'rpm': int, 'pct': int}}
+    """
+    states = {}
+    for gpu in gpus or []:
+        speeds = gpu_scanner.get_gpu_fan_speeds(gpu['index'], gpu.get('display', ':0'), gpu['fans'])
+        for fan, data in speeds.items():
+            states[(gpu['index'], fan)] = data
+    return states
+
+# GPUs already switched to manual fan control by set_fan_speed()
+_manual_gpus = set()
+
+def set_fan_speed(gpu_index, fan_index, pct):
+    print(f"Setting Fan {fan_index} on GPU {gpu_index} to {pct}%")
+    # NVML (driver 520+) sets the fan in-process, no X round-trip
+    if nvml.set_fan_speed(gpu_index, [fan_index], pct):
+        return
+    try:
+        # One nvidia-settings run per change; enable manual only once
+        cmd = ['nvidia-settings', '-c', ':0']
+        if gpu_index not in _manual_gpus:
+            cmd.extend(['-a', f'[gpu:{gpu_index}]/GPUFanControlState=1'])
+        cmd.extend(['-a', f'[fan:{fan_index}]/GPUTargetFanSpeed={pct}'])
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _manual_gpus.add(gpu_index)
+    except Exception as e:
+        print(f"Error setting speed: {e}")
+
+def reset_fan(gpu_index, fan_index):
+    """Return the fan to driver (auto) control"""
+    nvml.set_default_fan_speed(gpu_index, [fan_index])
+    # Only needed if the fan was driven through nvidia-settings
+    if gpu_index in _manual_gpus:
+        subprocess.run(['nvidia-settings', '-c', ':0', '-a', f'[gpu:{gpu_index}]/GPUFanControlState=0'], 
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _manual_gpus.discard(gpu_index)
+
+def monitor_response(gpu_index, fan_index, target, timeout=5.0, tolerance=2):
+    """
+    Poll the fan after a speed change until it settles or timeout expires.
+    Starts at 100ms and doubles the interval (up to 1s) while readings are stable.
+    """
+    print(f"Monitoring response for up to {timeout:.0f} seconds...")
+    deadline = time.monotonic() + timeout
+    interval = 0.1
+    last = None
+    stable = 0
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        current = get_gpu_fan_state(gpu_index, fan_index)
+        print(f"RPM={current.get('rpm', '?')} | Driver %={current.get('pct', '?')}")
+        
+        sample = (current.get('rpm'), current.get('pct'))
+        if sample == last:
+            stable += 1
+            interval = min(interval * 2, 1.0)
+        else:
+            stable = 0
+        last = sample
+        
+        pct = current.get('pct')
+        if stable >= 2 and isinstance(pct, int) and abs(pct - target) <= tolerance:
+            print("Fan settled.")
+            break
+
+def read_command(gpus, refresh=0.5):
+    """
+    Keep the status line (all GPU fans) updating until a command is entered.
+    Returns the stripped input line, or 'q' on EOF.
+    """
+    while True:
+        states = get_all_fan_states(gpus)
+        status = ' | '.join(
+            f"GPU{g}/Fan{f}: RPM={st.get('rpm', '?')} %={st.get('pct', '?')}"
+            for (g, f), st in sorted(states.items())
+        )
+        # Erase line + rewrite in a single write() per refresh
+        sys.stdout.write(f"\x1b[2K\rCurrent: {status or '?'} > ")
+        sys.stdout.flush()
+        
+        ready, _, _ = select.select([sys.stdin], [], [], refresh)
+        if ready:
+            line = sys.stdin.readline()
+            if not line:
+                return 'q'
+            return line.strip()
+
+def main():
+    print("=== GPU Fan Debugger ===")
+    
+    gpus = gpu_scanner.scan_nvidia_gpus()
+    if not gpus:
+        print("No NVIDIA GPUs found.")
+        return
+
+    print(f"Found {len(gpus)} GPUs.")
+    for gpu in gpus:
+        print(f"GPU {gpu['index']}: {gpu['name']} ({gpu['fan_count']} fans)")
+    
+    gpu_idx = 0
+    fan_idx = 0
+    
+    if len(gpus) > 0:
+        gpu_idx = gpus[0]['index']
+        if gpus[0]['fan_count'] > 0:
+            fan_idx = gpus[0]['fans'][0]
+            
+    print(f"\nTesting GPU {gpu_idx} Fan {fan_idx}")
+    
+    try:
+        while True:
+            print("\nEnter target % (0-100) or 'q' to quit")
+            cmd = read_command(gpus)
+            if cmd.lower() == 'q':
+                break
+            
+            if cmd.isdigit():
+                target = int(cmd)
+                if 0 <= target <= 100:
+                    set_fan_speed(gpu_idx, fan_idx, target)
+                    monitor_response(gpu_idx, fan_idx, target)
+                else:
+                    print("Invalid range (0-100)")
+            else:
+                print("Invalid input")
+                
+    except KeyboardInterrupt:
+        print("\nExiting...")
+        
+    print("\nResetting to Auto...")
+    reset_fan(gpu_idx, fan_idx)
+
+if __name__ == "__main__":
+    main()
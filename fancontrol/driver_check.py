@@ -1,15 +1,41 @@
 import subprocess
+import time
+
+from . import spawn
+
+# Seconds a check_nvidia_driver() result is reused
+DRIVER_CHECK_TTL = 30
+
+_cache = {'time': 0, 'result': None}
+
+
+def invalidate():
+    """Forget the cached driver check result"""
+    _cache['result'] = None
+
 
 def check_nvidia_driver():
     """
     Check if NVIDIA driver is available and working.
+    The result is cached for DRIVER_CHECK_TTL seconds.
     Returns:
         bool: True if driver is available and nvidia-smi works
         int: Number of GPUs found (0 if driver not available)
     """
+    now = time.monotonic()
+    if _cache['result'] is not None and now - _cache['time'] < DRIVER_CHECK_TTL:
+        return _cache['result']
+    
+    result = _query_nvidia_driver()
+    _cache['time'] = now
+    _cache['result'] = result
+    return result
+
+
+def _query_nvidia_driver():
     try:
         # Check nvidia-smi presence and functionality
-        result = subprocess.run(
+        result = spawn.run(
             ['nvidia-smi', '--query-gpu=count', '--format=csv,noheader'],
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
@@ -18,7 +44,7 @@ def check_nvidia_driver():
         
         if result.returncode == 0:
             try:
-                count = int(result.stdout.decode().strip())
+                count = int(result.stdout)  # int() accepts bytes with surrounding whitespace
                 return True, count
             except:
                 return True, 0
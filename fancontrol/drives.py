@@ -4,87 +4,128 @@ Drive Scanning Module
 Handles scanning all drives and returning configured drives for monitoring.
 """
 import subprocess
-import json
+from concurrent.futures import ThreadPoolExecutor
 
+from . import fastjson
+from . import spawn
 
-def scan_all_drives():
-    """Scan all block devices and return their info with temperature"""
+
+# Upper bound on concurrent smartctl processes during a scan
+MAX_SCAN_WORKERS = 16
+
+
+def _smart_temperature(smart_data):
+    """Extract current temperature from smartctl JSON output"""
+    try:
+        temperature = smart_data.get('temperature', {}).get('current')
+        
+        if temperature is None:
+            for attr in smart_data.get('ata_smart_attributes', {}).get('table', []):
+                if attr.get('id') == 194:
+                    temperature = attr.get('raw', {}).get('value', 0) & 0xFF
+                    break
+        
+        if temperature is None and 'nvme_smart_health_information_log' in smart_data:
+            temperature = smart_data['nvme_smart_health_information_log'].get('temperature')
+    except (AttributeError, TypeError):
+        # Unexpected JSON layout
+        return None
+    
+    return temperature
+
+
+def _smart_data(device_path):
+    """Identity (-i) and attributes (-A) in one smartctl run; None on failure"""
+    try:
+        try:
+            smart_out = spawn.check_output(
+                ['smartctl', '--json=c', '-i', '-A', device_path],
+                stderr=subprocess.DEVNULL, timeout=5
+            )
+        except subprocess.CalledProcessError as e:
+            # smartctl exit codes are a bitmask, the JSON is still on stdout
+            smart_out = e.output
+        smart_data = fastjson.loads(smart_out)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+    return smart_data if isinstance(smart_data, dict) else None
+
+
+def _scan_drive(dev, serial_whitelist=None, temperatures=True):
+    """Build the drive entry for one lsblk device (None to skip it)"""
+    name = dev.get('name', '')
+    if not name or name.startswith('loop') or name.startswith('sr'):
+        return None
+    
+    device_path = f'/dev/{name}'
+    serial = dev.get('serial') or ''
+    model = dev.get('model') or 'Unknown'
+    size = dev.get('size') or 'Unknown'
+    tran = dev.get('tran') or ''
+    rota = dev.get('rota')
+    
+    if 'nvme' in name or tran == 'nvme':
+        drive_type = 'NVMe'
+    elif rota is False or rota == '0':
+        drive_type = 'SSD'
+    else:
+        drive_type = 'HDD'
+    
+    # Drives known (by lsblk serial) not to be wanted aren't probed at all,
+    # nor are any when only identities are asked for and lsblk had the serial.
+    temperature = None
+    if not serial or (temperatures and (serial_whitelist is None or serial in serial_whitelist)):
+        smart_data = _smart_data(device_path)
+        if smart_data:
+            if not serial:
+                serial = smart_data.get('serial_number', '')
+            temperature = _smart_temperature(smart_data)
+    
+    return {
+        'serial': serial,
+        'device': device_path,
+        'model': model.strip() if model else 'Unknown',
+        'size': size,
+        'type': drive_type,
+        'temperature': temperature
+    }
+
+
+def scan_all_drives(serial_whitelist=None, temperatures=True):
+    """
+    Scan all block devices and return their info with temperature.
+    With serial_whitelist, drives whose lsblk serial isn't in it are
+    listed without probing smartctl (temperature None); with
+    temperatures=False no drive is probed unless lsblk lacks its serial.
+    """
     drives = []
     
     try:
-        lsblk_out = subprocess.check_output(
+        lsblk_out = spawn.check_output(
             ['lsblk', '-J', '-d', '-o', 'NAME,SIZE,MODEL,SERIAL,TRAN,ROTA'],
             stderr=subprocess.DEVNULL
-        ).decode()
-        lsblk_data = json.loads(lsblk_out)
+        )
+        lsblk_data = fastjson.loads(lsblk_out)
+        devices = lsblk_data.get('blockdevices', [])
         
-        for dev in lsblk_data.get('blockdevices', []):
-            name = dev.get('name', '')
-            if not name or name.startswith('loop') or name.startswith('sr'):
-                continue
-            
-            device_path = f'/dev/{name}'
-            serial = dev.get('serial') or ''
-            model = dev.get('model') or 'Unknown'
-            size = dev.get('size') or 'Unknown'
-            tran = dev.get('tran') or ''
-            rota = dev.get('rota')
-            
-            if 'nvme' in name or tran == 'nvme':
-                drive_type = 'NVMe'
-            elif rota is False or rota == '0':
-                drive_type = 'SSD'
-            else:
-                drive_type = 'HDD'
-            
-            if not serial:
-                try:
-                    smart_out = subprocess.check_output(
-                        ['smartctl', '-j', '-i', device_path],
-                        stderr=subprocess.DEVNULL, timeout=5
-                    ).decode()
-                    smart_data = json.loads(smart_out)
-                    serial = smart_data.get('serial_number', '')
-                except:
-                    pass
-            
-            temperature = None
-            try:
-                smart_out = subprocess.check_output(
-                    ['smartctl', '-j', '-A', device_path],
-                    stderr=subprocess.DEVNULL, timeout=5
-                ).decode()
-                smart_data = json.loads(smart_out)
-                
-                temperature = smart_data.get('temperature', {}).get('current')
-                
-                if temperature is None:
-                    for attr in smart_data.get('ata_smart_attributes', {}).get('table', []):
-                        if attr.get('id') == 194:
-                            temperature = attr.get('raw', {}).get('value', 0) & 0xFF
-                            break
-                
-                if temperature is None and 'nvme_smart_health_information_log' in smart_data:
-                    temperature = smart_data['nvme_smart_health_information_log'].get('temperature')
-            except:
-                pass
-            
-            drives.append({
-                'serial': serial,
-                'device': device_path,
-                'model': model.strip() if model else 'Unknown',
-                'size': size,
-                'type': drive_type,
-                'temperature': temperature
-            })
+        # smartctl runs are independent and mostly waiting on the drive, so
+        # probe in parallel: a scan takes as long as the slowest drive
+        if devices:
+            with ThreadPoolExecutor(max_workers=min(len(devices), MAX_SCAN_WORKERS)) as pool:
+                results = pool.map(lambda dev: _scan_drive(dev, serial_whitelist, temperatures), devices)
+                drives = [d for d in results if d is not None]
     except Exception as e:
         print(f"Error scanning drives: {e}")
     
     return drives
 
 
-def get_configured_drives(current_config):
-    """Get list of drives that are configured for monitoring"""
+def get_configured_drives(current_config, temperatures=True):
+    """
+    Get list of drives that are configured for monitoring.
+    temperatures=False skips the smartctl temperature probe, for callers
+    that only need device paths and serials.
+    """
     if not current_config:
         return []
     
@@ -93,7 +134,7 @@ def get_configured_drives(current_config):
     if not monitored_serials:
         return []
     
-    all_drives = scan_all_drives()
+    all_drives = scan_all_drives(set(monitored_serials), temperatures)
     configured = []
     
     for serial in monitored_serials:
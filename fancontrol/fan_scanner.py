@@ -5,11 +5,11 @@ Scans hwmon devices for fans and PWM controllers.
 Provides functions for discovering and testing fan hardware.
 """
 import os
-import glob
 from pathlib import Path
 from typing import List, Dict, Optional
 from . import gpu_scanner
 from . import driver_check
+from .sysfs import SysfsAttr, HWMON_ROOT, list_entries
 
 
 def scan_hwmon_devices() -> List[Dict]:
@@ -26,13 +26,12 @@ def scan_hwmon_devices() -> List[Dict]:
     """
     devices = []
     
-    for hwmon_path in sorted(glob.glob('/sys/class/hwmon/hwmon*')):
+    for hwmon_path in list_entries(HWMON_ROOT, 'hwmon'):
         try:
-            name_file = os.path.join(hwmon_path, 'name')
-            if os.path.exists(name_file):
-                with open(name_file, 'r') as f:
+            try:
+                with open(os.path.join(hwmon_path, 'name'), 'r') as f:
                     chip_name = f.read().strip()
-            else:
+            except FileNotFoundError:
                 chip_name = os.path.basename(hwmon_path)
             
             # Find fans and PWMs for this device
@@ -67,11 +66,11 @@ def scan_fans_in_hwmon(hwmon_path: str) -> List[Dict]:
     """
     fans = []
     
-    for fan_input in sorted(glob.glob(os.path.join(hwmon_path, 'fan*_input'))):
+    for fan_input in list_entries(hwmon_path, 'fan', '_input'):
         try:
             # Extract fan ID (e.g., "fan2" from "fan2_input")
-            basename = os.path.basename(fan_input)
-            fan_id = basename.replace('_input', '')
+            base = fan_input[:-6]  # strip '_input'
+            fan_id = os.path.basename(base)
             
             # Read current RPM
             with open(fan_input, 'r') as f:
@@ -84,13 +83,11 @@ def scan_fans_in_hwmon(hwmon_path: str) -> List[Dict]:
             }
             
             # Try to read label if exists
-            label_path = os.path.join(hwmon_path, f'{fan_id}_label')
-            if os.path.exists(label_path):
-                try:
-                    with open(label_path, 'r') as f:
-                        fan_info['label'] = f.read().strip()
-                except:
-                    pass
+            try:
+                with open(base + '_label', 'r') as f:
+                    fan_info['label'] = f.read().strip()
+            except OSError:
+                pass
             
             fans.append(fan_info)
         except Exception as e:
@@ -115,7 +112,10 @@ def scan_pwms_in_hwmon(hwmon_path: str) -> List[Dict]:
     """
     pwms = []
     
-    for pwm_path in sorted(glob.glob(os.path.join(hwmon_path, 'pwm[0-9]'))):
+    # pwm1..pwm9 (not pwm1_enable etc.)
+    for pwm_path in list_entries(hwmon_path, 'pwm'):
+        if not (len(os.path.basename(pwm_path)) == 4 and pwm_path[-1].isdigit()):
+            continue
         try:
             # Extract PWM ID (e.g., "pwm2")
             pwm_id = os.path.basename(pwm_path)
@@ -133,13 +133,17 @@ def scan_pwms_in_hwmon(hwmon_path: str) -> List[Dict]:
             
             # Check enable file
             enable_path = pwm_path + '_enable'
-            if os.path.exists(enable_path):
+            try:
+                with open(enable_path, 'r') as f:
+                    enable = int(f.read().strip())
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError):
                 pwm_info['enable_path'] = enable_path
-                try:
-                    with open(enable_path, 'r') as f:
-                        pwm_info['enable'] = int(f.read().strip())
-                except:
-                    pwm_info['enable'] = None
+                pwm_info['enable'] = None
+            else:
+                pwm_info['enable_path'] = enable_path
+                pwm_info['enable'] = enable
             
             pwms.append(pwm_info)
         except Exception as e:
@@ -157,24 +161,56 @@ def get_fan_rpm(fan_input_path: str) -> int:
         return 0
 
 
+# [(key, SysfsAttr)] of all fans from the last hwmon scan. The hwmon
+# layout doesn't change at runtime, so RPM polling only re-reads these
+# (one pread each on fds kept open between polls).
+_fan_inputs = None
+
+
+def _fan_input_list(devices: List[Dict]) -> List[tuple]:
+    # Use chip name, not hwmon path
+    return [(f"{device['name']}/{fan['id']}", SysfsAttr(fan['input_path']))
+            for device in devices for fan in device['fans']]
+
+
+def _read_rpm(attr: SysfsAttr) -> int:
+    try:
+        return attr.read_int()
+    except (OSError, ValueError):
+        return 0
+
+
 def get_all_fans_rpm(devices: List[Dict] = None) -> Dict[str, int]:
     """
     Get current RPM for all fans.
     
     Returns: {"it8613/fan2": 1150, "it8613/fan3": 980, ...}
     Uses chip name (from device['name']) for consistency with scan_all().
+    Without devices, the fan layout cached from the last scan is used.
     """
-    if devices is None:
-        devices = scan_hwmon_devices()
+    global _fan_inputs
+    if devices is not None:
+        return {f"{device['name']}/{fan['id']}": get_fan_rpm(fan['input_path'])
+                for device in devices for fan in device['fans']}
     
-    result = {}
-    for device in devices:
-        chip_name = device['name']  # Use chip name, not hwmon path
-        for fan in device['fans']:
-            key = f"{chip_name}/{fan['id']}"
-            result[key] = get_fan_rpm(fan['input_path'])
-    
-    return result
+    if _fan_inputs is None:
+        _fan_inputs = _fan_input_list(scan_hwmon_devices())
+    return {key: _read_rpm(attr) for key, attr in _fan_inputs}
+
+
+# PWMs already switched to manual control by set_pwm_value()
+_enabled_pwms = set()
+
+
+def reset_enable_cache(pwm_path: str = None):
+    """
+    Forget that a PWM (or all of them) was switched to manual control,
+    e.g. after handing it back to automatic mode.
+    """
+    if pwm_path is None:
+        _enabled_pwms.clear()
+    else:
+        _enabled_pwms.discard(pwm_path)
 
 
 def set_pwm_value(pwm_path: str, value: int) -> bool:
@@ -185,13 +221,19 @@ def set_pwm_value(pwm_path: str, value: int) -> bool:
     """
     value = max(0, min(255, value))
     try:
-        # First, try to enable manual control
+        # First, try to enable manual control (once; each enable write
+        # makes the driver reprogram the chip)
         enable_path = pwm_path + '_enable'
-        if os.path.exists(enable_path):
+        if pwm_path not in _enabled_pwms:
             try:
-                with open(enable_path, 'w') as f:
-                    f.write('1')  # 1 = manual control
-            except:
+                # No O_CREAT: a missing enable file just means no manual switch
+                fd = os.open(enable_path, os.O_WRONLY)
+                try:
+                    os.write(fd, b'1')  # 1 = manual control
+                finally:
+                    os.close(fd)
+                _enabled_pwms.add(pwm_path)
+            except OSError:
                 pass
         
         # Set the PWM value
@@ -199,6 +241,8 @@ def set_pwm_value(pwm_path: str, value: int) -> bool:
             f.write(str(value))
         return True
     except Exception as e:
+        # Re-enable manual control on the next attempt
+        _enabled_pwms.discard(pwm_path)
         print(f"Error setting PWM {pwm_path} to {value}: {e}")
         return False
 
@@ -247,6 +291,8 @@ def scan_all() -> Dict:
     }
     """
     devices = scan_hwmon_devices()
+    # A rescan is where a BIOS/driver reset of pwmN_enable gets noticed
+    reset_enable_cache()
     
     total_fans = 0
     total_pwms = 0
@@ -272,8 +318,12 @@ def scan_unified() -> Dict:
     Unified scan for UI.
     Returns structure matching FanScanResult in frontend.
     """
-    # 1. Scan System Fans
+    global _fan_inputs
+    
+    # 1. Scan System Fans (and refresh the layout used for RPM polling)
     system_devices = scan_hwmon_devices()
+    _fan_inputs = _fan_input_list(system_devices)
+    reset_enable_cache()
     
     # 2. Check NVIDIA Driver
     driver_avail, gpu_count = driver_check.check_nvidia_driver()
@@ -315,23 +365,16 @@ def scan_unified() -> Dict:
         gpu_idx = gpu['index']
         gpu_name = gpu['name']
         
+        # scan_nvidia_gpus() only returns fan indices, so fetch RPMs for all
+        # of this GPU's fans in one query
+        try:
+            speeds = gpu_scanner.get_gpu_fan_speeds(gpu_idx, gpu.get('display', ':0'), gpu['fans'])
+        except:
+            speeds = {}
+        
         for fan_idx in gpu['fans']: # List of indices [0, 1...]
             unique_id = f"gpu{gpu_idx}_fan{fan_idx}"
-            
-            # Fetch specific fan RPM if not already in gpu object (gpu object has temp but maybe not individual fan RPMs easily? 
-            # scan_nvidia_gpus returns 'fans': [0, 1], 'fan_count': 2. It doesn't put RPM in there yet.
-            # We can fetch RPMs in batch or individually.
-            # Let's use get_gpu_fan_speeds to be safe/accurate.
-            # Or reliance on gpu_scanner implementation?
-            # gpu_scanner.scan_nvidia_gpus() does NOT return RPMs in the list items (only temp).
-            
-            # Fetch RPM
-            rpm = 0
-            try:
-                speeds = gpu_scanner.get_gpu_fan_speeds(gpu_idx, gpu.get('display', ':0'), [fan_idx])
-                rpm = speeds.get(fan_idx, {}).get('rpm', 0)
-            except:
-                pass
+            rpm = speeds.get(fan_idx, {}).get('rpm', 0)
                 
             allocatable_fan = {
                 'id': unique_id,
@@ -0,0 +1,35 @@
+"""
+Fast JSON Module
+
+Uses orjson when installed (several times faster, emits bytes directly),
+otherwise falls back to the stdlib json module with the same interface.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(data) -> bytes:
+        """Serialize to compact JSON bytes"""
+        # Some API payloads are keyed by int (e.g. GPU fan index)
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def dumps_indented(data) -> bytes:
+        """Serialize to human-readable JSON bytes (2-space indent, UTF-8)"""
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+
+    loads = orjson.loads
+else:
+    def dumps(data) -> bytes:
+        """Serialize to compact JSON bytes"""
+        return json.dumps(data, separators=(',', ':')).encode()
+
+    def dumps_indented(data) -> bytes:
+        """Serialize to human-readable JSON bytes (2-space indent, UTF-8)"""
+        return json.dumps(data, indent=2, ensure_ascii=False).encode()
+
+    loads = json.loads
@@ -1,29 +1,79 @@
 """
 GPU Scanner Module
 
-Scans for NVIDIA GPUs and their fans using nvidia-smi and nvidia-settings.
+Scans for NVIDIA GPUs and their fans using NVML (nvidia-smi as fallback)
+and nvidia-settings.
 Provides functions for discovering GPU hardware configuration.
 """
 import subprocess
+import shutil
+import os
 import re
 from typing import List, Dict, Optional
 
+from . import nvml
+from . import spawn
+from .cache import ttl_cache
+
+# Seconds a GPU scan result is reused
+SCAN_CACHE_TTL = 30
+
+
+_persistence_checked = False
+
+
+def ensure_persistence_mode() -> None:
+    """
+    Enable NVIDIA persistence mode once per process, so the driver stays
+    initialized between queries instead of every nvidia-smi /
+    nvidia-settings call paying the driver start-up. Needs root.
+    """
+    global _persistence_checked
+    if _persistence_checked:
+        return
+    _persistence_checked = True
+    
+    if shutil.which('nvidia-smi') is None:
+        return
+    if os.geteuid() != 0:
+        print("Warning: not running as root, NVIDIA persistence mode not enabled")
+        return
+    try:
+        spawn.run(
+            ['nvidia-smi', '-pm', '1'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=10
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Error enabling NVIDIA persistence mode: {e}")
+
+
+_display = None
+
 
 def detect_display() -> str:
     """
     Detect the X display to use for nvidia-settings.
     Returns ':0' by default, or attempts to find active display.
+    A display that answered is remembered; the default is not, so an X
+    server started later is still found.
     """
+    global _display
+    if _display is not None:
+        return _display
+    
     # Try common displays
     for display in [':0', ':1', ':2']:
         try:
-            result = subprocess.run(
+            result = spawn.run(
                 ['nvidia-settings', '-c', display, '-q', 'GPUCoreTemp'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
                 timeout=3
             )
             if result.returncode == 0:
+                _display = display
                 return display
         except:
             continue
@@ -32,48 +82,66 @@ def detect_display() -> str:
 
 def get_gpu_count() -> int:
     """Get the number of NVIDIA GPUs in the system."""
+    handles = nvml.get_handles()
+    if handles:
+        return len(handles)
     try:
-        result = subprocess.run(
+        result = spawn.run(
             ['nvidia-smi', '--query-gpu=count', '--format=csv,noheader'],
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
             timeout=5
         )
         if result.returncode == 0:
-            lines = result.stdout.decode().strip().split('\n')
-            return len(lines)
+            return len(result.stdout.strip().split(b'\n'))
     except:
         pass
     return 0
 
 
-def get_fan_count(gpu_index: int = 0, display: str = ':0') -> int:
+# Fan targets in 'nvidia-settings -q fans' output, e.g. "[0] pve:0[fan:0] (Fan 0)"
+FAN_TARGET_RE = re.compile(rb'\[fan:(\d+)\]')
+
+
+def list_fans(display: str = ':0') -> List[int]:
     """
-    Get the number of fans for a specific GPU.
-    Tries querying fans until one fails.
+    nvidia-settings indices of all fans on a display, from one
+    'nvidia-settings -q fans' enumeration instead of probing index by index.
     """
-    fan_count = 0
-    for i in range(10):  # Max 10 fans per GPU
-        try:
-            result = subprocess.run(
-                ['nvidia-settings', '-c', display, '-t', 
-                 '-q', f'[fan:{i}]/GPUCurrentFanSpeedRPM'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=3
-            )
-            if result.returncode == 0 and result.stdout.decode().strip().isdigit():
-                fan_count += 1
-            else:
-                break
-        except:
-            break
-    return fan_count
+    try:
+        out = spawn.check_output(
+            ['nvidia-settings', '-c', display, '-q', 'fans'],
+            stderr=subprocess.DEVNULL,
+            timeout=3
+        )
+    except:
+        return []
+    return sorted({int(m.group(1)) for m in FAN_TARGET_RE.finditer(out)})
+
+
+def get_fan_indices(gpu_index: int = 0, display: str = ':0') -> List[int]:
+    """
+    nvidia-settings indices of a GPU's fans. NVML knows which fans belong
+    to which GPU; the nvidia-settings enumeration does not, so without NVML
+    every GPU is given all fans of the display.
+    """
+    indices = nvml.get_fan_indices(gpu_index)
+    if indices is not None:
+        return indices
+    return list_fans(display)
+
+
+def get_fan_count(gpu_index: int = 0, display: str = ':0') -> int:
+    """Get the number of fans for a specific GPU."""
+    return len(get_fan_indices(gpu_index, display))
 
 
-def scan_nvidia_gpus() -> List[Dict]:
+@ttl_cache(SCAN_CACHE_TTL)
+def scan_nvidia_gpus(display: Optional[str] = None) -> List[Dict]:
     """
     Scan all NVIDIA GPUs in the system.
+    display defaults to detect_display().
+    The result is cached for SCAN_CACHE_TTL seconds.
     
     Returns list of:
     {
@@ -86,11 +154,31 @@ def scan_nvidia_gpus() -> List[Dict]:
     }
     """
     gpus = []
-    display = detect_display()
+    if display is None:
+        display = detect_display()
+    
+    # In-process NVML query, no nvidia-smi fork
+    handles = nvml.get_handles()
+    if handles:
+        for gpu_index in range(len(handles)):
+            info = nvml.get_gpu_info(gpu_index)
+            if info is None:
+                continue
+            fan_indices = get_fan_indices(gpu_index, display)
+            gpus.append({
+                'index': gpu_index,
+                'name': info['name'],
+                'uuid': info['uuid'],
+                'fans': fan_indices,
+                'fan_count': len(fan_indices),
+                'temperature': info['temperature'],
+                'display': display
+            })
+        return gpus
     
     try:
         # Query GPU list
-        result = subprocess.run(
+        result = spawn.run(
             ['nvidia-smi', '--query-gpu=index,name,uuid,temperature.gpu',
              '--format=csv,noheader,nounits'],
             stdout=subprocess.PIPE,
@@ -101,6 +189,9 @@ def scan_nvidia_gpus() -> List[Dict]:
         if result.returncode != 0:
             return []
         
+        # Same fan list for every GPU here (see get_fan_indices), enumerate once
+        fan_indices = None
+        
         lines = result.stdout.decode().strip().split('\n')
         for line in lines:
             if not line.strip():
@@ -115,16 +206,15 @@ def scan_nvidia_gpus() -> List[Dict]:
             gpu_uuid = parts[2]
             gpu_temp = int(parts[3]) if parts[3].isdigit() else 0
             
-            # Get fan count for this GPU
-            fan_count = get_fan_count(gpu_index, display)
-            fan_indices = list(range(fan_count))
+            if fan_indices is None:
+                fan_indices = list_fans(display)
             
             gpus.append({
                 'index': gpu_index,
                 'name': gpu_name,
                 'uuid': gpu_uuid,
                 'fans': fan_indices,
-                'fan_count': fan_count,
+                'fan_count': len(fan_indices),
                 'temperature': gpu_temp,
                 'display': display
             })
@@ -144,6 +234,34 @@ def get_gpu_fan_speeds(gpu_index: int = 0, display: str = ':0',
     if fan_indices is None:
         fan_indices = [0, 1]
     
+    # In-process NVML read, no nvidia-settings fork / X round-trip
+    speeds = nvml.get_fan_speeds(gpu_index, fan_indices)
+    if speeds is not None:
+        return speeds
+    
+    # All fans in one nvidia-settings run (one terse line per query),
+    # parsed as bytes: int() and isdigit() take them without a decode
+    if len(fan_indices) > 1:
+        cmd = ['nvidia-settings', '-c', display, '-t']
+        for fan_idx in fan_indices:
+            cmd.extend(['-q', f'[fan:{fan_idx}]/GPUCurrentFanSpeedRPM',
+                        '-q', f'[fan:{fan_idx}]/GPUCurrentFanSpeed'])
+        try:
+            out = spawn.check_output(cmd, stderr=subprocess.DEVNULL, timeout=3)
+            lines = out.split()
+        except:
+            lines = []
+        # A failed query prints nothing, so only trust a complete answer
+        if len(lines) == 2 * len(fan_indices):
+            result = {}
+            for i, fan_idx in enumerate(fan_indices):
+                rpm, pct = lines[2 * i], lines[2 * i + 1]
+                result[fan_idx] = {
+                    'rpm': int(rpm) if rpm.isdigit() else 0,
+                    'pct': int(pct) if pct.isdigit() else 0
+                }
+            return result
+    
     result = {}
     for fan_idx in fan_indices:
         try:
@@ -152,11 +270,11 @@ def get_gpu_fan_speeds(gpu_index: int = 0, display: str = ':0',
                 '-q', f'[fan:{fan_idx}]/GPUCurrentFanSpeedRPM',
                 '-q', f'[fan:{fan_idx}]/GPUCurrentFanSpeed'
             ]
-            out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, timeout=3)
-            lines = out.decode().strip().split('\n')
+            out = spawn.check_output(cmd, stderr=subprocess.DEVNULL, timeout=3)
+            lines = out.split()
             
-            rpm = int(lines[0]) if len(lines) > 0 and lines[0].strip().isdigit() else 0
-            pct = int(lines[1]) if len(lines) > 1 and lines[1].strip().isdigit() else 0
+            rpm = int(lines[0]) if len(lines) > 0 and lines[0].isdigit() else 0
+            pct = int(lines[1]) if len(lines) > 1 and lines[1].isdigit() else 0
             
             result[fan_idx] = {'rpm': rpm, 'pct': pct}
         except:
@@ -176,23 +294,17 @@ def test_gpu_fan(fan_index: int, target_pct: int,
         current = get_gpu_fan_speeds(gpu_index, display, [fan_index])
         prev_pct = current.get(fan_index, {}).get('pct', 0)
         
-        # Enable manual control
-        subprocess.run(
-            ['nvidia-settings', '-c', display, '-a',
-             f'[gpu:{gpu_index}]/GPUFanControlState=1'],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=3
-        )
-        
-        # Set fan speed
-        subprocess.run(
-            ['nvidia-settings', '-c', display, '-a',
-             f'[fan:{fan_index}]/GPUTargetFanSpeed={target_pct}'],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=3
-        )
+        # NVML sets the speed (and manual mode) in-process; otherwise enable
+        # manual control and set the speed in one nvidia-settings run
+        if not nvml.set_fan_speed(gpu_index, [fan_index], target_pct):
+            spawn.run(
+                ['nvidia-settings', '-c', display,
+                 '-a', f'[gpu:{gpu_index}]/GPUFanControlState=1',
+                 '-a', f'[fan:{fan_index}]/GPUTargetFanSpeed={target_pct}'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=3
+            )
         
         return {
             'success': True,
@@ -209,8 +321,11 @@ def test_gpu_fan(fan_index: int, target_pct: int,
 
 def reset_gpu_fans(gpu_index: int = 0, display: str = ':0') -> bool:
     """Reset GPU fans to automatic control."""
+    fan_indices = nvml.get_fan_indices(gpu_index)
+    if fan_indices is not None and nvml.set_default_fan_speed(gpu_index, fan_indices):
+        return True
     try:
-        subprocess.run(
+        spawn.run(
             ['nvidia-settings', '-c', display, '-a',
              f'[gpu:{gpu_index}]/GPUFanControlState=0'],
             stdout=subprocess.DEVNULL,
@@ -236,8 +351,9 @@ def scan_all() -> Dict:
         }
     }
     """
+    ensure_persistence_mode()
     display = detect_display()
-    gpus = scan_nvidia_gpus()
+    gpus = scan_nvidia_gpus(display)
     
     total_fans = sum(gpu['fan_count'] for gpu in gpus)
     
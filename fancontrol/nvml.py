@@ -0,0 +1,190 @@
+"""
+NVML Module
+
+In-process NVIDIA GPU telemetry via pynvml (nvidia-ml-py).
+Every function returns None when NVML is unavailable or the query is not
+supported, so callers can fall back to nvidia-smi / nvidia-settings.
+"""
+import threading
+from typing import List, Dict, Optional
+
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+_lock = threading.Lock()
+_handles = None
+_fan_counts = {}
+_identities = {}
+
+
+def get_handles() -> List:
+    """Initialize NVML once and return device handles ([] if unavailable)."""
+    global _handles
+    if _handles is None:
+        with _lock:
+            if _handles is None:
+                handles = []
+                if pynvml is not None:
+                    try:
+                        pynvml.nvmlInit()
+                        handles = [pynvml.nvmlDeviceGetHandleByIndex(i)
+                                   for i in range(pynvml.nvmlDeviceGetCount())]
+                    except Exception:
+                        handles = []
+                _handles = handles
+    return _handles
+
+
+def available() -> bool:
+    """True if NVML is initialized and sees at least one GPU."""
+    return bool(get_handles())
+
+
+def get_fan_count(gpu_index: int = 0) -> Optional[int]:
+    """Number of fans on a GPU."""
+    if gpu_index in _fan_counts:
+        return _fan_counts[gpu_index]
+    handles = get_handles()
+    if gpu_index >= len(handles):
+        return None
+    try:
+        count = pynvml.nvmlDeviceGetNumFans(handles[gpu_index])
+    except Exception:
+        return None
+    _fan_counts[gpu_index] = count
+    return count
+
+
+def _fan_offset(gpu_index: int) -> Optional[int]:
+    """Global nvidia-settings index of the first fan on a GPU."""
+    offset = 0
+    for i in range(gpu_index):
+        count = get_fan_count(i)
+        if count is None:
+            return None
+        offset += count
+    return offset
+
+
+def _text(value) -> str:
+    """Older pynvml releases return bytes for string queries."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def get_gpu_info(gpu_index: int = 0) -> Optional[Dict]:
+    """
+    Static identity and current temperature of a GPU.
+    Identity is queried once per GPU, so later calls cost one driver call.
+
+    Returns: {'name': str, 'uuid': str, 'bus_id': str, 'temperature': int}
+    """
+    handles = get_handles()
+    if gpu_index >= len(handles):
+        return None
+    handle = handles[gpu_index]
+    try:
+        identity = _identities.get(gpu_index)
+        if identity is None:
+            identity = {
+                'name': _text(pynvml.nvmlDeviceGetName(handle)),
+                'uuid': _text(pynvml.nvmlDeviceGetUUID(handle)),
+                'bus_id': _text(pynvml.nvmlDeviceGetPciInfo(handle).busId)
+            }
+            _identities[gpu_index] = identity
+        temperature = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
+    except Exception:
+        return None
+    return dict(identity, temperature=temperature)
+
+
+def get_fan_indices(gpu_index: int = 0) -> Optional[List[int]]:
+    """nvidia-settings [fan:N] indices of the fans on a GPU."""
+    count = get_fan_count(gpu_index)
+    offset = _fan_offset(gpu_index)
+    if count is None or offset is None:
+        return None
+    return list(range(offset, offset + count))
+
+
+def get_temperature(gpu_index: int = 0) -> Optional[int]:
+    """Core temperature of a GPU in °C."""
+    handles = get_handles()
+    if gpu_index >= len(handles):
+        return None
+    try:
+        return pynvml.nvmlDeviceGetTemperature(handles[gpu_index], pynvml.NVML_TEMPERATURE_GPU)
+    except Exception:
+        return None
+
+
+def get_fan_speeds(gpu_index: int = 0,
+                   fan_indices: List[int] = None) -> Optional[Dict[int, Dict]]:
+    """
+    Get current fan speeds for a GPU.
+
+    fan_indices are nvidia-settings [fan:N] indices, which are numbered
+    across all GPUs; NVML numbers fans per GPU, so they are offset here.
+
+    Returns: {fan_index: {'rpm': int, 'pct': int}}
+    """
+    handles = get_handles()
+    if gpu_index >= len(handles):
+        return None
+    if fan_indices is None:
+        fan_indices = [0, 1]
+
+    offset = _fan_offset(gpu_index)
+    if offset is None:
+        return None
+
+    handle = handles[gpu_index]
+    result = {}
+    try:
+        for fan_idx in fan_indices:
+            local = fan_idx - offset
+            rpm = pynvml.nvmlDeviceGetFanSpeedRPM(handle, local)
+            result[fan_idx] = {
+                'rpm': int(getattr(rpm, 'speed', rpm)),
+                'pct': int(pynvml.nvmlDeviceGetFanSpeed_v2(handle, local))
+            }
+    except Exception:
+        # Older drivers/bindings lack the RPM query
+        return None
+    return result
+
+
+def set_fan_speed(gpu_index: int, fan_indices: List[int], pct: int) -> Optional[bool]:
+    """
+    Set fans (nvidia-settings indices) to a fixed percentage, which also
+    switches them to manual control. Needs root; returns None on failure.
+    """
+    handles = get_handles()
+    if gpu_index >= len(handles):
+        return None
+    offset = _fan_offset(gpu_index)
+    if offset is None:
+        return None
+    try:
+        for fan_idx in fan_indices:
+            pynvml.nvmlDeviceSetFanSpeed_v2(handles[gpu_index], fan_idx - offset, pct)
+    except Exception:
+        return None
+    return True
+
+
+def set_default_fan_speed(gpu_index: int, fan_indices: List[int]) -> Optional[bool]:
+    """Return fans to driver (auto) control. Returns None on failure."""
+    handles = get_handles()
+    if gpu_index >= len(handles):
+        return None
+    offset = _fan_offset(gpu_index)
+    if offset is None:
+        return None
+    try:
+        for fan_idx in fan_indices:
+            pynvml.nvmlDeviceSetDefaultFanSpeed_v2(handles[gpu_index], fan_idx - offset)
+    except Exception:
+        return None
+    return True
@@ -3,18 +3,28 @@ Sensor Manager Module
 
 Unified sensor management for all temperature sources:
 - hwmon (CPU, motherboard, chipset, etc.)
-- nvidia (GPU temperature via nvidia-smi)
+- nvidia (GPU temperature via NVML, nvidia-smi as fallback)
 - drives (HDD/SSD/NVMe via smartctl)
 
 Each sensor entity can have multiple physical sensors, 
 the maximum value is used for thresholds.
 """
 import subprocess
-import json
-import glob
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Any
 
+from . import config
+from . import fastjson
+from . import spawn
+from . import nvml
+from .cache import ttl_cache
+from .drives import MAX_SCAN_WORKERS
+from .sysfs import SysfsAttr, HWMON_ROOT, list_entries
+
 
 # Sensor visual presets
 VISUAL_PRESETS = {
@@ -24,33 +34,48 @@ VISUAL_PRESETS = {
 }
 
 
+# (threshold, divisor, suffix), largest first; smaller sizes are shown in GiB
+_SIZE_UNITS = (
+    (1000**4, 1000**4, 'TB'),
+    (1000**3, 1000**3, 'GB'),
+)
+
+
 def format_size(size_bytes: int) -> str:
     """Format bytes to GB/TB."""
-    if size_bytes >= 1000**4:
-        return f"{size_bytes / (1000**4):.1f} TB"
-    elif size_bytes >= 1024**4: # TiB check
-        return f"{size_bytes / (1024**4):.1f} TiB"
-    elif size_bytes >= 1000**3:
-        return f"{size_bytes / (1000**3):.1f} GB"
-    else:
-        return f"{size_bytes / (1024**3):.1f} GiB"
+    for threshold, divisor, suffix in _SIZE_UNITS:
+        if size_bytes >= threshold:
+            return f"{size_bytes / divisor:.1f} {suffix}"
+    return f"{size_bytes / (1024**3):.1f} GiB"
 
 
-def get_drive_details(device_path: str) -> Dict:
-    """Get detailed drive info via smartctl."""
+def _smartctl_json(args: List[str], device_path: str) -> Dict:
+    """Run smartctl with compact JSON output and parse it."""
+    # smartctl returns bitmask exit codes (e.g. 64), so check_output might fail
+    # but stdout will still contain the JSON.
     try:
-        # Use -a to get all info, -j for JSON
-        # smartctl returns bitmask exit codes (e.g. 64), so check_output might fail
-        # but stdout will still contain the JSON.
-        try:
-            o = subprocess.check_output(
-                ['smartctl', '-j', '-a', device_path],
-                stderr=subprocess.DEVNULL, timeout=5
-            )
-        except subprocess.CalledProcessError as e:
-            o = e.output
-            
-        j = json.loads(o)
+        o = spawn.check_output(
+            ['smartctl', '--json=c', *args, device_path],
+            stderr=subprocess.DEVNULL, timeout=5
+        )
+    except subprocess.CalledProcessError as e:
+        o = e.output
+    return fastjson.loads(o)
+
+
+# {device_path: static drive info}, identity never changes while attached
+_drive_static_info = {}
+
+
+def get_drive_static_info(device_path: str) -> Dict:
+    """
+    Model, serial, size, form factor, interface and type of a drive,
+    from smartctl -i (identity only). Cached after the first success.
+    """
+    if device_path in _drive_static_info:
+        return _drive_static_info[device_path]
+    try:
+        j = _smartctl_json(['-i'], device_path)
         
         # 1. Info / Model / Serial
         model = j.get('model_name', '')
@@ -86,32 +111,235 @@ def get_drive_details(device_path: str) -> Dict:
         if j.get('device', {}).get('protocol') == 'NVMe':
             interface = 'NVMe'
             dev_type = 'SSD'
-            # Try to get PCIe info if available (often not in smartctl basic output without extra flags, but let's check basic)
         elif j.get('scsi_transport_protocol', {}).get('name'):
              interface = j['scsi_transport_protocol']['name'] # e.g. SAS
         elif j.get('interface_speed', {}).get('current', {}).get('string'):
              interface = j['interface_speed']['current']['string']
-             
-        # 5. Temperature
-        temp = j.get('temperature', {}).get('current')
-        if temp is None:
-            # ATA Attribute 194 or 190
-            for a in j.get('ata_smart_attributes', {}).get('table', []):
-                if a['id'] in [194, 190]:
-                    temp = a['raw']['value'] & 0xFF
-                    break
-        
-        return {
-            'model': model,
-            'serial': serial,
-            'size': size_str,
-            'form_factor': ff,
-            'interface': interface,
-            'type': dev_type,
-            'temp': temp
-        }
     except:
         return {}
+    
+    info = {
+        'model': model,
+        'serial': serial,
+        'size': size_str,
+        'form_factor': ff,
+        'interface': interface,
+        'type': dev_type
+    }
+    _drive_static_info[device_path] = info
+    return info
+
+
+def get_drive_smart_temp(device_path: str) -> Optional[int]:
+    """Current drive temperature from smartctl -A (attributes only)."""
+    try:
+        j = _smartctl_json(['-A'], device_path)
+    except:
+        return None
+    
+    temp = j.get('temperature', {}).get('current')
+    if temp is None:
+        # ATA Attribute 194 or 190
+        for a in j.get('ata_smart_attributes', {}).get('table', []):
+            if a['id'] in [194, 190]:
+                temp = a['raw']['value'] & 0xFF
+                break
+    if temp is None:
+        temp = j.get('nvme_smart_health_information_log', {}).get('temperature')
+    return temp
+
+
+def get_drive_details(device_path: str) -> Dict:
+    """Get detailed drive info: cached identity plus a fresh temperature."""
+    info = get_drive_static_info(device_path)
+    if not info:
+        return {}
+    return dict(info, temp=get_drive_smart_temp(device_path))
+
+
+NVME_NAMESPACE_RE = re.compile(r'nvme\d+n\d+$')
+
+# Seconds a drive scan result is reused
+SCAN_CACHE_TTL = 30
+
+# Default seconds between background smartctl refreshes ('hdd_poll_interval' in config)
+HDD_POLL_INTERVAL = 60
+
+
+class SmartPoller:
+    """
+    Background smartctl poller.
+
+    Drive temperatures change over minutes, so instead of forking smartctl
+    for every drive on every control tick, a daemon thread refreshes the
+    watched drives periodically and readers get the cached details.
+    """
+
+    def __init__(self, interval: int = HDD_POLL_INTERVAL):
+        self.interval = interval
+        self.cache = {}
+        self.lock = threading.Lock()
+        # Drives read through get() since the last refresh; only these are
+        # polled, so removed or unconfigured drives drop out after a cycle
+        self._requested = set()
+        self._thread = None
+        self._bad_interval = None
+
+    def get(self, device_path: str) -> Dict:
+        """Return cached details for a drive, probing it once on first use."""
+        cache = self.cache
+        if device_path in cache:
+            with self.lock:
+                self._requested.add(device_path)
+            return cache[device_path]
+        
+        details = get_drive_details(device_path)
+        with self.lock:
+            self._requested.add(device_path)
+            new_cache = dict(self.cache)
+            new_cache[device_path] = details
+            self.cache = new_cache
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return details
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current {device_path: details} map. Replaced, never mutated."""
+        return self.cache
+
+    def refresh(self):
+        """Re-read the drives requested since the last refresh and swap in the new cache."""
+        with self.lock:
+            devices, self._requested = self._requested, set()
+        
+        fresh = {}
+        if devices:
+            # One smartctl per drive, run side by side
+            with ThreadPoolExecutor(max_workers=min(len(devices), MAX_SCAN_WORKERS)) as pool:
+                fresh = dict(zip(devices, pool.map(get_drive_details, devices)))
+        
+        with self.lock:
+            # Keep drives first probed by get() while this refresh ran
+            new_cache = {dev: details for dev, details in self.cache.items()
+                         if dev in self._requested}
+            new_cache.update(fresh)
+            self.cache = new_cache
+
+    def poll_interval(self) -> float:
+        """'hdd_poll_interval' from the config, or the default if it isn't a positive number"""
+        value = (config.current_config or {}).get('hdd_poll_interval', self.interval)
+        try:
+            interval = float(value)
+            if interval > 0:
+                return interval
+        except (TypeError, ValueError):
+            pass
+        if value != self._bad_interval:
+            print(f"Invalid hdd_poll_interval {value!r}, using {self.interval}s")
+            self._bad_interval = value
+        return self.interval
+
+    def _run(self):
+        while True:
+            try:
+                time.sleep(self.poll_interval())
+                self.refresh()
+            except Exception as e:
+                print(f"Error polling drives: {e}")
+                time.sleep(self.interval)
+
+
+smart_poller = SmartPoller()
+
+
+_drive_temp_attrs = None
+
+
+def get_drive_temp_attrs(refresh: bool = False) -> Dict[str, SysfsAttr]:
+    """
+    Map '/dev/<disk>' to the hwmon temp1_input of drives that report
+    temperature in sysfs (drivetemp for SATA/SAS, nvme for NVMe).
+    Resolved once; pass refresh=True to rescan.
+    """
+    global _drive_temp_attrs
+    if _drive_temp_attrs is None or refresh:
+        attrs = {}
+        for hwmon_path in list_entries(HWMON_ROOT, 'hwmon'):
+            try:
+                with open(os.path.join(hwmon_path, 'name'), 'r') as f:
+                    chip = f.read().strip()
+            except OSError:
+                continue
+            
+            if chip == 'drivetemp':
+                blocks = list_entries(os.path.join(hwmon_path, 'device', 'block'))
+            elif chip == 'nvme':
+                # Namespaces (nvme0n1) of the controller, not multipath paths (nvme0c0n1)
+                blocks = [b for b in list_entries(os.path.join(hwmon_path, 'device'), 'nvme')
+                          if NVME_NAMESPACE_RE.match(os.path.basename(b))]
+                # and the controller itself (/dev/nvme0), as smartctl --scan names it
+                blocks.append(os.path.realpath(os.path.join(hwmon_path, 'device')))
+            else:
+                continue
+            
+            temp_input = os.path.join(hwmon_path, 'temp1_input')
+            for block in blocks:
+                attrs[f'/dev/{os.path.basename(block)}'] = SysfsAttr(temp_input)
+        _drive_temp_attrs = attrs
+    return _drive_temp_attrs
+
+
+def get_drive_temp(device_path: str) -> Optional[float]:
+    """
+    Current drive temperature: read from sysfs when the drive exposes it,
+    otherwise the cached smartctl value from the background poller.
+    """
+    attr = get_drive_temp_attrs().get(device_path)
+    if attr is not None:
+        try:
+            return attr.read_int() / 1000.0
+        except (OSError, ValueError):
+            pass
+    return smart_poller.get(device_path).get('temp')
+
+
+# {temp_input path: (SysfsAttr, label, chip name, hwmon name)}
+_hwmon_inputs = {}
+
+# {hwmon directory: chip name}, shared by all inputs of a chip
+_chip_names = {}
+
+
+def get_hwmon_input(path: str) -> tuple:
+    """
+    Open hwmon temperature input with its label ('' if it has none) and
+    chip name. Those are static, so they are read once and only the value
+    is re-read (a single pread on the kept-open fd) each tick.
+    """
+    entry = _hwmon_inputs.get(path)
+    if entry is None:
+        label = ''
+        try:
+            with open(path[:-6] + '_label', 'r') as f:  # '..._input' -> '..._label'
+                label = f.read().strip()
+        except OSError:
+            pass
+        
+        hwmon_dir = os.path.dirname(path)
+        chip_name = _chip_names.get(hwmon_dir)
+        if chip_name is None:
+            chip_name = ''
+            try:
+                with open(os.path.join(hwmon_dir, 'name'), 'r') as f:
+                    chip_name = f.read().strip()
+            except OSError:
+                pass
+            _chip_names[hwmon_dir] = chip_name
+        
+        entry = (SysfsAttr(path), label, chip_name, os.path.basename(hwmon_dir))
+        _hwmon_inputs[path] = entry
+    return entry
 
 
 def scan_all_sources() -> Dict[str, List[Dict]]:
@@ -136,7 +364,7 @@ def scan_hwmon_sensors() -> List[Dict]:
     """Scan all hwmon temperature sensors."""
     sensors = []
     
-    for hwmon_path in sorted(glob.glob('/sys/class/hwmon/hwmon*')):
+    for hwmon_path in list_entries(HWMON_ROOT, 'hwmon'):
         hwmon_name = os.path.basename(hwmon_path)
         
         # Get chip name
@@ -148,26 +376,17 @@ def scan_hwmon_sensors() -> List[Dict]:
             continue
         
         # Find all temperature inputs
-        for temp_input in sorted(glob.glob(os.path.join(hwmon_path, 'temp*_input'))):
-            temp_id = os.path.basename(temp_input).replace('_input', '')
+        for temp_input in list_entries(hwmon_path, 'temp', '_input'):
+            temp_id = os.path.basename(temp_input[:-6])  # strip '_input'
             
-            # Read current value
-            value = 0.0
+            # Label comes from the shared input cache, which read_sensor_data
+            # then finds warm for sensors created from this scan
+            attr, label, _, _ = get_hwmon_input(temp_input)
             try:
-                with open(temp_input, 'r') as f:
-                    value = int(f.read().strip()) / 1000.0
-            except:
+                value = attr.read_int() / 1000.0
+            except (OSError, ValueError):
                 continue
             
-            # Try to read label
-            label = ''
-            label_path = temp_input.replace('_input', '_label')
-            try:
-                with open(label_path, 'r') as f:
-                    label = f.read().strip()
-            except:
-                pass
-            
             sensors.append({
                 'source': 'hwmon',
                 'path': temp_input,
@@ -185,8 +404,23 @@ def scan_nvidia_sensors() -> List[Dict]:
     """Scan NVIDIA GPU temperature sensors."""
     sensors = []
     
+    # In-process NVML query, no nvidia-smi fork
+    handles = nvml.get_handles()
+    if handles:
+        for gpu_index in range(len(handles)):
+            info = nvml.get_gpu_info(gpu_index)
+            if info is not None:
+                sensors.append({
+                    'source': 'nvidia',
+                    'gpu_index': gpu_index,
+                    'label': info['name'],
+                    'value': info['temperature'],
+                    'suggested_preset': 'accelerator'
+                })
+        return sensors
+    
     try:
-        out = subprocess.check_output(
+        out = spawn.check_output(
             ['nvidia-smi', '--query-gpu=index,name,temperature.gpu', '--format=csv,noheader'],
             stderr=subprocess.DEVNULL
         ).decode().strip()
@@ -212,41 +446,64 @@ def scan_nvidia_sensors() -> List[Dict]:
     return sensors
 
 
+def list_drive_devices() -> List[str]:
+    """
+    Paths of drives smartctl can probe, from one 'smartctl --scan' (which
+    also leaves out zram and other virtual disks). Falls back to lsblk disks.
+    Devices only reachable through a RAID controller ('-d megaraid,N' on a
+    shared /dev/bus/N path) are skipped: sensors address drives by path.
+    """
+    try:
+        scan = fastjson.loads(spawn.check_output(
+            ['smartctl', '--json=c', '--scan'],
+            stderr=subprocess.DEVNULL, timeout=10
+        ))
+        return [d['name'] for d in scan.get('devices', [])
+                if d.get('name', '').startswith('/dev/') and ',' not in d.get('type', '')]
+    except Exception:
+        pass
+    
+    lsblk = spawn.check_output(
+        ['lsblk', '-d', '-n', '-o', 'NAME,TYPE'],
+        stderr=subprocess.DEVNULL
+    ).decode().strip()
+    
+    devices = []
+    for line in lsblk.split('\n'):
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == 'disk':
+            devices.append(f'/dev/{parts[0]}')
+    return devices
+
+
+@ttl_cache(SCAN_CACHE_TTL)
 def scan_drive_sensors() -> List[Dict]:
-    """Scan drive temperature sensors via smartctl."""
+    """
+    Scan drive temperature sensors via smartctl.
+    The result is cached for SCAN_CACHE_TTL seconds.
+    """
     sensors = []
     
-    # Find all block devices
     try:
-        lsblk = subprocess.check_output(
-            ['lsblk', '-d', '-n', '-o', 'NAME,TYPE'],
-            stderr=subprocess.DEVNULL
-        ).decode().strip()
+        devices = list_drive_devices()
         
-        for line in lsblk.split('\n'):
-            parts = line.split()
-            if len(parts) >= 2:
-                name = parts[0]
-                dev_type = parts[1]
-                
-                if dev_type != 'disk':
-                    continue
-                
-                device_path = f'/dev/{name}'
-                
-                # Get details via smartctl helper
-                details = get_drive_details(device_path)
-                
-                if details and details.get('temp') is not None:
-                    sensors.append({
-                        'source': 'drive',
-                        'device': device_path,
-                        'serial': details['serial'],
-                        'label': details['model'] or name,
-                        'value': details['temp'],
-                        'details': details, # Include full details
-                        'suggested_preset': 'storage'
-                    })
+        # Get details via smartctl helper, all drives in parallel
+        all_details = []
+        if devices:
+            with ThreadPoolExecutor(max_workers=min(len(devices), MAX_SCAN_WORKERS)) as pool:
+                all_details = list(pool.map(get_drive_details, devices))
+        
+        for device_path, details in zip(devices, all_details):
+            if details and details.get('temp') is not None:
+                sensors.append({
+                    'source': 'drive',
+                    'device': device_path,
+                    'serial': details['serial'],
+                    'label': details['model'] or os.path.basename(device_path),
+                    'value': details['temp'],
+                    'details': details, # Include full details
+                    'suggested_preset': 'storage'
+                })
     except:
         pass
     
@@ -275,57 +532,50 @@ def read_sensor_data(sensor_config: Dict) -> Dict:
     if source == 'hwmon':
         paths = sensor_config.get('paths', [])
         for path in paths:
+            attr, label, chip_name, hwmon_name = get_hwmon_input(path)
             try:
-                # Try to get label
-                label_path = path.replace('_input', '_label')
-                label = os.path.basename(path)
-                if os.path.exists(label_path):
-                    with open(label_path, 'r') as f:
-                        label = f.read().strip()
+                val = attr.read_int() / 1000.0
+            except (OSError, ValueError):
+                continue
+            sources_data.append({
+                'label': label or os.path.basename(path),
+                'value': val,
+                'chip': chip_name,
+                'hwmon': hwmon_name,
+                'type': 'hwmon'
+            })
+                
+    elif source == 'nvidia':
+        gpu_index = sensor_config.get('gpu_index', 0)
+        info = nvml.get_gpu_info(gpu_index)
+        if info is not None:
+            sources_data.append({
+                'label': info['name'],
+                'value': float(info['temperature']),
+                'bus_id': info['bus_id'],
+                'type': 'nvidia'
+            })
+        else:
+            try:
+                # No NVML: one nvidia-smi query
+                out = spawn.check_output(
+                    ['nvidia-smi', '-i', str(gpu_index), '--query-gpu=name,temperature.gpu,pci.bus_id', '--format=csv,noheader'],
+                    stderr=subprocess.DEVNULL
+                ).decode().strip()
+                parts = out.split(',')
+                if len(parts) >= 2:
+                    name = parts[0].strip()
+                    val = float(parts[1].strip())
+                    bus_id = parts[2].strip() if len(parts) > 2 else ''
                 
-                # Try to get chip name
-                chip_name = ''
-                hwmon_dir = os.path.dirname(path)
-                name_path = os.path.join(hwmon_dir, 'name')
-                if os.path.exists(name_path):
-                     with open(name_path, 'r') as f:
-                        chip_name = f.read().strip()
-
-                with open(path, 'r') as f:
-                    val = int(f.read().strip()) / 1000.0
                     sources_data.append({
-                        'label': label,
+                        'label': name,
                         'value': val,
-                        'chip': chip_name,
-                        'hwmon': os.path.basename(hwmon_dir),
-                        'type': 'hwmon'
+                        'bus_id': bus_id,
+                        'type': 'nvidia'
                     })
             except:
                 pass
-                
-    elif source == 'nvidia':
-        gpu_index = sensor_config.get('gpu_index', 0)
-        try:
-            # We can use cached info from config if we want to show model name without queyring every time
-            # For now query simply
-            out = subprocess.check_output(
-                ['nvidia-smi', '-i', str(gpu_index), '--query-gpu=name,temperature.gpu,pci.bus_id', '--format=csv,noheader'],
-                stderr=subprocess.DEVNULL
-            ).decode().strip()
-            parts = out.split(',')
-            if len(parts) >= 2:
-                name = parts[0].strip()
-                val = float(parts[1].strip())
-                bus_id = parts[2].strip() if len(parts) > 2 else ''
-                
-                sources_data.append({
-                    'label': name,
-                    'value': val,
-                    'bus_id': bus_id,
-                    'type': 'nvidia'
-                })
-        except:
-            pass
 
     elif source == 'drive':
         devices = sensor_config.get('devices', [])
@@ -333,13 +583,14 @@ def read_sensor_data(sensor_config: Dict) -> Dict:
         
         for device in devices:
             try:
-                # Try to get fresh data
-                details = get_drive_details(device)
-                val = details.get('temp')
+                # Live sysfs temperature where available; model/serial come
+                # from cached smartctl data, refreshed by the background poller
+                details = smart_poller.get(device)
+                val = get_drive_temp(device)
                 
                 # Fallback to cached info if detailed scan fails
                 if val is not None:
-                    display_details = details
+                    display_details = details or cached_info.get(device, {})
                 elif device in cached_info:
                     display_details = cached_info[device]
                 else:
@@ -364,6 +615,11 @@ def read_sensor_data(sensor_config: Dict) -> Dict:
     return result
 
 
+def get_gpu_temp(gpu_index: int = 0) -> Optional[float]:
+    """GPU temperature through the same NVML / nvidia-smi path as nvidia sensors."""
+    return read_sensor_data({'type': 'nvidia', 'gpu_index': gpu_index})['value']
+
+
 def read_sensor_value(sensor_config: Dict) -> Optional[float]:
     """Legacy wrapper for backward compatibility."""
     res = read_sensor_data(sensor_config)
@@ -4,11 +4,12 @@ Sensors Module
 Handles reading temperature values from CPU, GPU, and drives.
 """
 import subprocess
-import json
 import glob
 import os
 
 from . import drives
+from . import nvml
+from . import spawn
 
 
 def get_vals(current_config):
@@ -36,15 +37,10 @@ def get_vals(current_config):
     # GPU fallback (if nvidia group exists but no 'gpu' sensor configured)
     gpu_group = cfg.get_nvidia_group()
     if 'gpu' not in sensor_values and gpu_group:
-        try:
-            # Try to read straight from nvidia-smi if not configured as sensor
-            out = subprocess.check_output(
-                ['nvidia-smi', '--query-gpu=temperature.gpu', '--format=csv,noheader'],
-                stderr=subprocess.DEVNULL
-            )
-            sensor_values['gpu'] = int(out.strip())
-        except:
-            pass
+        # Shared NVML handle, nvidia-smi only without NVML
+        gpu_temp = sensor_manager.get_gpu_temp(gpu_group.get('gpu_config', {}).get('gpu_index', 0))
+        if gpu_temp is not None:
+            sensor_values['gpu'] = gpu_temp
 
     # Read GPU fans (independent of sensor system for now)
     gpu_fans = {}
@@ -56,20 +52,26 @@ def get_vals(current_config):
             
             gpu_fans = {f'fan{i}': {'rpm': 0, 'pct': 0} for i in fan_indices}
             
-            # Build dynamic nvidia-settings command
-            cmd = ['nvidia-settings', '-c', display, '-t']
-            for i in fan_indices:
-                cmd.extend(['-q', f'[fan:{i}]/GPUCurrentFanSpeedRPM'])
-                cmd.extend(['-q', f'[fan:{i}]/GPUCurrentFanSpeed'])
-            
-            out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode().strip().split('\n')
-            
-            for idx, fan_idx in enumerate(fan_indices):
-                base = idx * 2
-                if base + 1 < len(out):
-                    rpm = int(out[base]) if out[base].strip().isdigit() else 0
-                    pct = int(out[base + 1]) if out[base + 1].strip().isdigit() else 0
-                    gpu_fans[f'fan{fan_idx}'] = {'rpm': rpm, 'pct': pct}
+            speeds = nvml.get_fan_speeds(gpu_cfg.get('gpu_index', 0), fan_indices)
+            if speeds is not None:
+                for fan_idx, data in speeds.items():
+                    gpu_fans[f'fan{fan_idx}'] = data
+            else:
+                # Build dynamic nvidia-settings command
+                cmd = ['nvidia-settings', '-c', display, '-t']
+                for i in fan_indices:
+                    cmd.extend(['-q', f'[fan:{i}]/GPUCurrentFanSpeedRPM'])
+                    cmd.extend(['-q', f'[fan:{i}]/GPUCurrentFanSpeed'])
+                
+                # Terse numeric lines, parsed as bytes (no decode needed)
+                out = spawn.check_output(cmd, stderr=subprocess.DEVNULL).split()
+                
+                for idx, fan_idx in enumerate(fan_indices):
+                    base = idx * 2
+                    if base + 1 < len(out):
+                        rpm = int(out[base]) if out[base].isdigit() else 0
+                        pct = int(out[base + 1]) if out[base + 1].isdigit() else 0
+                        gpu_fans[f'fan{fan_idx}'] = {'rpm': rpm, 'pct': pct}
         except:
             pass
 
@@ -79,8 +81,19 @@ def get_vals(current_config):
     hdd_all = {}
     hdd_by_serial = {}
     
+    # Drive temperatures the 'drive' sensors above have just read
+    # (the CPU/GPU fallbacks store plain numbers, not sensor data)
+    covered = {}
+    for data in sensor_values.values():
+        if not isinstance(data, dict):
+            continue
+        for src in data.get('sources', ()):
+            if src.get('type') == 'drive' and src.get('value') is not None:
+                covered[src['device']] = src['value']
+    
     try:
-        configured_drives = drives.get_configured_drives(current_config)
+        # Only paths and serials are needed here, temperatures are read below
+        configured_drives = drives.get_configured_drives(current_config, temperatures=False)
         
         for drive_info in configured_drives:
             device_path = drive_info.get('device', '')
@@ -89,28 +102,12 @@ def get_vals(current_config):
             
             if not d: continue
             
-            val = None
-            # Check if this drive is covered by a 'drive' sensor
-            # This is complex because sensors map to devices/serials. 
-            # For now, we keep legacy scan for HDD logic to ensure 'hddMax' works for legacy configs
-            # Ideally we should migrate drives to sensors too.
-            
             try:
-                # Reuse code or call drive scanner? 
-                # Calling subprocess here again is inefficient if sensor_manager already did it.
-                # But sensor_manager only reads CONFIGURED sensors.
-                # Here we read configured DRIVES (legacy config).
-                
-                o = subprocess.check_output(['smartctl', '-j', '-A', device_path], stderr=subprocess.DEVNULL, timeout=5)
-                j = json.loads(o)
-                t = j.get('temperature', {}).get('current')
+                # Reuse a 'drive' sensor reading of this device; otherwise sysfs
+                # or the shared background SMART poller, never a smartctl fork.
+                t = covered.get(device_path)
                 if t is None:
-                    for a in j.get('ata_smart_attributes', {}).get('table', []):
-                        if a['id'] == 194:
-                            t = a['raw']['value'] & 0xFF
-                            break
-                if t is None and 'nvme_smart_health_information_log' in j:
-                    t = j['nvme_smart_health_information_log'].get('temperature')
+                    t = sensor_manager.get_drive_temp(device_path)
                 
                 if t is not None:
                     hdd_all[d] = t
@@ -0,0 +1,44 @@
+"""
+Spawn Module
+
+subprocess wrappers for the external tools run by the daemon
+(nvidia-smi, nvidia-settings, smartctl, lsblk, systemctl).
+
+CPython only starts a child with posix_spawn() (no fork of the daemon's
+address space) when the executable is given as a path, close_fds is False
+and no preexec_fn / cwd / session options are used. These wrappers resolve
+the command to its full path and pass close_fds=False; that is safe because
+Python creates all descriptors non-inheritable (PEP 446).
+"""
+import shutil
+import subprocess
+
+# {command name: absolute path}
+_paths = {}
+
+
+def _argv(cmd):
+    name = cmd[0]
+    path = _paths.get(name)
+    if path is None:
+        path = shutil.which(name)
+        if path is None:
+            # Not installed (yet): let subprocess raise FileNotFoundError
+            return cmd
+        _paths[name] = path
+    return [path, *cmd[1:]]
+
+
+def run(cmd, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run() on the posix_spawn fast path"""
+    return subprocess.run(_argv(cmd), close_fds=False, **kwargs)
+
+
+def check_output(cmd, **kwargs) -> bytes:
+    """subprocess.check_output() on the posix_spawn fast path"""
+    return subprocess.check_output(_argv(cmd), close_fds=False, **kwargs)
+
+
+def popen(cmd, **kwargs) -> subprocess.Popen:
+    """subprocess.Popen() on the posix_spawn fast path, without waiting"""
+    return subprocess.Popen(_argv(cmd), close_fds=False, **kwargs)
@@ -3,51 +3,101 @@ State Manager Module
 
 AutoStateManager handles automatic fan mode switching based on temperature thresholds.
 """
+import math
 import time
 
+# Generated classifiers, keyed by (base_mode, ladder)
+_classifier_cache = {}
+
+
+def _build_classifier(base_mode, ladder):
+    """
+    Generate a classify(sensor_values) function with the threshold ladder
+    unrolled into literal comparisons, e.g.:
+
+        def classify(sensor_values):
+            get = sensor_values.get
+            if get('cpu', 0) > 62 or get('gpu', 0) > 82: return '3'
+            return '0'
+    """
+    key = (base_mode, ladder)
+    func = _classifier_cache.get(key)
+    if func is not None:
+        return func
+    
+    ns = {}
+    lines = ["def classify(sensor_values):", "    get = sensor_values.get"]
+    for mode, limits in ladder:
+        if not limits:
+            continue
+        conds = []
+        for source, limit in limits:
+            if isinstance(limit, (int, float)) and not isinstance(limit, bool) and math.isfinite(limit):
+                lit = repr(limit)
+            else:
+                # Not representable as a literal, bind it as a constant instead
+                lit = f"_c{len(ns)}"
+                ns[lit] = limit
+            conds.append(f"get({source!r}, 0) > {lit}")
+        lines.append(f"    if {' or '.join(conds)}: return {mode!r}")
+    lines.append(f"    return {base_mode!r}")
+    
+    exec(compile('\n'.join(lines), '<state_manager.classify>', 'exec'), ns)
+    func = ns['classify']
+    _classifier_cache[key] = func
+    return func
+
 
 class AutoStateManager:
     """Automatic fan mode state machine with escalation/de-escalation logic"""
     
     def __init__(self, config):
-        self.config = config
-        self.current_mode = '0' if '0' in config['TARGETS'] else '1'
+        self.set_config(config)
+        self.current_mode = self.base_mode
         self.last_mode_change_time = 0
         self.pending_mode = None
         self.pending_start_time = 0
         self.status_msg = "Init"
+
+    def set_config(self, config):
+        """Apply a (possibly changed) config and precompile the threshold ladder"""
+        self.config = config
+        self.base_mode = '0' if '0' in config['TARGETS'] else '1'
         
         # Sort mode keys for correct hierarchy check (4 > 3 > 2 > 1 > 0)
         self.mode_keys = sorted(config['THRESHOLDS'].keys(), key=lambda x: int(x), reverse=True)
+        
+        # [(mode, ((source, limit), ...)), ...], highest mode first, unset limits dropped
+        self.ladder = tuple(
+            (mode, tuple((source, limit)
+                         for source, limit in config['THRESHOLDS'][mode].items()
+                         if limit is not None))
+            for mode in self.mode_keys
+        )
+        # Reused while the thresholds are unchanged
+        self.classify = _build_classifier(self.base_mode, self.ladder)
+        
+        # Numeric level of every mode key, so update() does no int() parsing
+        self.levels = {mode: int(mode) for mode in (*self.mode_keys, self.base_mode)}
 
     def update(self, sensor_values):
-        """Update state machine with current temperatures, returns current mode"""
+        """
+        Update state machine with current temperatures, returns current mode.
+        sensor_values is shared between groups and must not be modified.
+        """
         now = time.time()
         
         # 1. Determine "Instant" Mode
-        instant_mode = '0' if '0' in self.config['TARGETS'] else '1'
-        
-        for mode in self.mode_keys:
-            thresh = self.config['THRESHOLDS'][mode]
-            
-            # OR logic: if ANY configured metric exceeds its threshold
-            # Config structure: {'cpu': 60, 'gpu': 70, 'custom_sensor': 50}
-            triggered = False
-            for source, limit in thresh.items():
-                if limit is not None:
-                    # Lookup current value for this source
-                    val = sensor_values.get(source, 0)
-                    if val > limit:
-                        triggered = True
-                        break
-            
-            if triggered:
-                instant_mode = mode
-                break
+        # OR logic: the highest mode where ANY configured metric exceeds its threshold
+        # Config structure: {'cpu': 60, 'gpu': 70, 'custom_sensor': 50}
+        instant_mode = self.classify(sensor_values)
         
         # 2. State Machine
-        curr_lvl = int(self.current_mode)
-        inst_lvl = int(instant_mode)
+        levels = self.levels
+        curr_lvl = levels.get(self.current_mode)
+        if curr_lvl is None:
+            curr_lvl = int(self.current_mode)
+        inst_lvl = levels[instant_mode]
         
         if inst_lvl > curr_lvl:  # Escalation
             delay = self.config['DELAY_UP']
@@ -0,0 +1,81 @@
+"""
+Sysfs Module
+
+Persistent file descriptors for sysfs attributes polled every tick.
+"""
+import os
+import threading
+
+HWMON_ROOT = '/sys/class/hwmon'
+
+
+def list_entries(directory: str, prefix: str = '', suffix: str = '') -> list:
+    """
+    Sorted paths of entries in a directory whose names match prefix/suffix
+    ([] if it can't be read). A plain scandir filter, cheaper than glob
+    for these fixed sysfs name patterns.
+    """
+    try:
+        with os.scandir(directory) as it:
+            return sorted(e.path for e in it
+                          if e.name.startswith(prefix) and e.name.endswith(suffix))
+    except OSError:
+        return []
+
+
+class SysfsAttr:
+    """
+    A sysfs attribute kept open and accessed with pread/pwrite at offset 0,
+    instead of an open/read/close cycle per access.
+
+    After any error the fd is dropped and reopened on the next access,
+    so a hot-unplugged or re-enumerated device recovers by itself.
+    Instances are shared by the control loop and web handler threads, so
+    each access holds a lock: an fd is never closed (and its number
+    reused) while another thread is still reading through it.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.flags = os.O_RDWR if writable else os.O_RDONLY
+        self.fd = None
+        self.lock = threading.Lock()
+
+    def _get_fd(self) -> int:
+        if self.fd is None:
+            self.fd = os.open(self.path, self.flags)
+        return self.fd
+
+    def read_int(self) -> int:
+        """Read the attribute as an integer. Raises OSError/ValueError."""
+        with self.lock:
+            try:
+                return int(os.pread(self._get_fd(), 32, 0))
+            except (OSError, ValueError):
+                self._close()
+                raise
+
+    def write(self, value) -> None:
+        """Write a value to the attribute. Raises OSError."""
+        with self.lock:
+            try:
+                os.pwrite(self._get_fd(), str(value).encode(), 0)
+            except OSError:
+                self._close()
+                raise
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+    def __del__(self):
+        # No other reference is left, so no lock is needed
+        self._close()
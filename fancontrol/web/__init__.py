@@ -5,7 +5,10 @@ from .server import (
     FanControlHandler,
     start_http_server,
     current_state,
+    publish_status,
     history_logger,
+    log_history,
+    record_history,
     LOG_INTERVAL,
     get_history_from_logs
 )
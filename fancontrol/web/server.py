@@ -3,48 +3,233 @@ Web Server Module
 
 HTTP server for fan control API and static file serving.
 """
+import gzip
 import os
-import json
+import queue
+import socket
 import time
 import threading
 import logging
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from functools import wraps
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl
 from logging.handlers import RotatingFileHandler
 
 from .. import config
+from .. import fastjson
 from .. import fan_scanner
 from .. import gpu_scanner
 from .. import cpu_scanner
+from .. import driver_check
 from .. import sensor_manager
+from .. import spawn
+from ..drives import MAX_SCAN_WORKERS
 
 # --- WEB SERVER CONFIG ---
 HTTP_PORT = 8080
 STATIC_DIR = Path(__file__).parent.parent.parent / 'fancontrol-ui' / 'dist'
+# UI files sent gzip-compressed to clients that accept it
+COMPRESSIBLE_SUFFIXES = ('.html', '.js', '.css', '.svg', '.json', '.map')
 LOG_DIR = Path('/var/log/fan_control')
 LOG_FILE = LOG_DIR / 'history.jsonl'
 LOG_MAX_BYTES = 10 * 1024 * 1024
 LOG_BACKUP_COUNT = 5
 LOG_INTERVAL = 5
+HISTORY_QUEUE_SIZE = 64
+# /api/history?range=... -> seconds
+HISTORY_RANGES = {'1m': 60, '5m': 300, '30m': 1800, '1h': 3600, '6h': 21600, '1d': 86400, '1w': 604800, '1mo': 2592000}
+# /api/history returns at most this many points (evenly thinned), plenty for a chart
+HISTORY_MAX_POINTS = 1000
+MAX_CONCURRENT_REQUESTS = 8
+# Largest accepted POST body (the full config is a few KB)
+MAX_POST_BYTES = 64 * 1024
+MAX_STATUS_STREAMS = 8
+# Seconds between comment lines on an idle status stream (detects closed clients)
+STREAM_KEEPALIVE = 15
+# Bytes gathered before each chunk of a streamed JSON array response
+STREAM_CHUNK_SIZE = 64 * 1024
 
 # --- SETUP LOGGING ---
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
+class HistoryFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler for the history log. Rollover is decided from the
+    stream position rather than by formatting each record a second time,
+    and write_lines() appends a batch of entries with a single write.
+    """
+    
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        return self.maxBytes > 0 and self.stream.tell() >= self.maxBytes
+    
+    def write_lines(self, lines):
+        self.acquire()
+        try:
+            if self.shouldRollover(None):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+        finally:
+            self.release()
+
+
 history_logger = logging.getLogger('history')
 history_logger.setLevel(logging.INFO)
-_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+_handler = HistoryFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
 _handler.setFormatter(logging.Formatter('%(message)s'))
 history_logger.addHandler(_handler)
 
 # --- SHARED STATE ---
+# 'data'/'status_body' are swapped whole by publish_status(); 'lock' guards history_ring
 current_state = {
     'data': None,
+    'status_body': None,
     'lock': threading.Lock()
 }
 
+# Recent history entries appended by the main loop, guarded by current_state['lock'].
+# Seeded from the log files on first use; /api/history is served from here
+# when it covers the requested range.
+HISTORY_RING_SIZE = 10000
+history_ring = deque(maxlen=HISTORY_RING_SIZE)
+
+
+# Notified by publish_status() for /api/status/stream subscribers
+_status_changed = threading.Condition()
+
 
-def get_history_from_logs(limit=300):
-    """Read last N entries from log files"""
+def publish_status(data):
+    """
+    Publish a freshly built status dict for /api/status.
+    The JSON body is serialized once here instead of per request.
+    Plain reference stores, so readers need no lock; the published
+    dict must never be mutated afterwards.
+    
+    Returns the serialized JSON bytes.
+    """
+    body = fastjson.dumps(data)
+    current_state['data'] = data
+    current_state['status_body'] = body
+    with _status_changed:
+        _status_changed.notify_all()
+    return body
+
+
+def record_history(entry):
+    """Append a status entry to the in-memory history ring"""
+    with current_state['lock']:
+        history_ring.append(entry)
+
+
+_ring_seeded = False
+_seed_lock = threading.Lock()
+
+
+def seed_history_ring():
+    """
+    Fill the history ring from the log files once, so after a restart it
+    again reaches back HISTORY_RING_SIZE entries and /api/history can be
+    served without touching the disk.
+    """
+    global _ring_seeded
+    if _ring_seeded:
+        return
+    with _seed_lock:
+        if _ring_seeded:
+            return
+        entries = get_history_from_logs(HISTORY_RING_SIZE)
+        with current_state['lock']:
+            # Entries recorded since startup are in the logs too
+            if history_ring:
+                first = history_ring[0].get('timestamp', 0)
+                entries = [e for e in entries if e.get('timestamp', 0) < first]
+            recorded = list(history_ring)
+            history_ring.clear()
+            history_ring.extend(entries)
+            history_ring.extend(recorded)
+        _ring_seeded = True
+
+
+# Serialized entries waiting for the history file writer thread
+_history_queue = queue.Queue(maxsize=HISTORY_QUEUE_SIZE)
+_history_thread = None
+
+
+def _history_worker():
+    while True:
+        # Everything queued meanwhile goes out in the same write
+        batch = [_history_queue.get()]
+        while True:
+            try:
+                batch.append(_history_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _handler.write_lines([body.decode() for body in batch])
+        except Exception as e:
+            print(f"Error writing history: {e}")
+
+
+def log_history(body):
+    """
+    Queue a serialized status entry for the history log.
+    File writes (and rotation) happen on a background thread so a slow
+    disk never stalls the control loop; if the writer falls behind,
+    the oldest queued entry is dropped.
+    """
+    global _history_thread
+    if _history_thread is None:
+        _history_thread = threading.Thread(target=_history_worker, daemon=True)
+        _history_thread.start()
+    while True:
+        try:
+            _history_queue.put_nowait(body)
+            return
+        except queue.Full:
+            try:
+                _history_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def reverse_lines(path, block_size=64 * 1024, end=None):
+    """
+    Yield non-empty lines of a file from last to first, reading backwards
+    in blocks. end limits reading to the first end bytes of the file.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell() if end is None else min(end, f.tell())
+        tail = b''
+        while pos > 0:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + tail).split(b'\n')
+            # First piece may be a partial line, keep it for the next block
+            tail = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+
+def get_history_from_logs(limit=300, cutoff_time=None, current_size=None):
+    """
+    Read last N entries from log files, streaming each file from its end.
+    Stops early once an entry older than cutoff_time is reached.
+    current_size limits how much of history.jsonl itself is read.
+    """
     entries = []
     try:
         # Sort log files: current file first, then rotated files in order (.1, .2, ...)
@@ -60,97 +245,257 @@ def get_history_from_logs(limit=300):
                 return 999
         log_files.sort(key=sort_key)
         
+        done = False
         for log_file in log_files:
-            if len(entries) >= limit:
+            if done or len(entries) >= limit:
                 break
             try:
-                with open(log_file, 'r') as f:
-                    lines = f.readlines()
-                    # Read from end of file (newest entries last in file)
-                    for line in reversed(lines):
-                        if len(entries) >= limit:
-                            break
-                        try:
-                            entries.append(json.loads(line.strip()))
-                        except:
-                            pass
+                # Newest entries are last in file
+                end = current_size if log_file.name == 'history.jsonl' else None
+                for line in reverse_lines(log_file, end=end):
+                    if len(entries) >= limit:
+                        break
+                    try:
+                        entry = fastjson.loads(line)
+                    except:
+                        continue
+                    ts = entry.get('timestamp', 0)
+                    if cutoff_time and ts and ts < cutoff_time:
+                        done = True
+                        break
+                    entries.append(entry)
             except:
                 pass
     except:
         pass
     entries.reverse()
-    return entries[-limit:]
+    return entries
+
+
+def _read_appended(path, offset):
+    """Parse the complete lines appended to a log since offset"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    # A line still being written is left for the next read
+    complete = data.rfind(b'\n') + 1
+    entries = []
+    for line in data[:complete].split(b'\n'):
+        if line.strip():
+            try:
+                entries.append(fastjson.loads(line))
+            except ValueError:
+                pass
+    return entries, offset + complete
+
+
+# Parsed disk history kept between /api/history requests
+_log_cache = {'inode': None, 'offset': 0, 'limit': 0, 'cutoff': None, 'entries': []}
+_log_cache_lock = threading.Lock()
+
+
+def read_history(limit, cutoff_time):
+    """
+    get_history_from_logs() with the parsed entries kept in memory.
+    While history.jsonl only grows, a request parses just the lines appended
+    since the previous one. Rotation or a wider range triggers a full read.
+    """
+    try:
+        st = os.stat(LOG_FILE)
+    except OSError:
+        return get_history_from_logs(limit, cutoff_time)
+    
+    with _log_cache_lock:
+        cache = _log_cache
+        reusable = (cache['inode'] == st.st_ino and cache['offset'] <= st.st_size
+                    and limit <= cache['limit'] and cache['cutoff'] is not None
+                    and cutoff_time >= cache['cutoff'])
+        if reusable:
+            if cache['offset'] < st.st_size:
+                new_entries, cache['offset'] = _read_appended(LOG_FILE, cache['offset'])
+                cache['entries'].extend(new_entries)
+                del cache['entries'][:-cache['limit']]
+        else:
+            cache.update(
+                inode=st.st_ino, offset=st.st_size, limit=limit, cutoff=cutoff_time,
+                entries=get_history_from_logs(limit, cutoff_time, current_size=st.st_size)
+            )
+        entries = cache['entries']
+        start = bisect_left(entries, cutoff_time, key=lambda e: e.get('timestamp', 0))
+        return entries[start:][-limit:]
+
+
+_static_files = None
+
+
+def static_files():
+    """URL paths of the built UI files, listed once (restart after a UI rebuild)"""
+    global _static_files
+    if _static_files is None:
+        _static_files = frozenset('/' + p.relative_to(STATIC_DIR).as_posix()
+                                  for p in STATIC_DIR.rglob('*') if p.is_file())
+    return _static_files
+
+
+# {url path: (st_mtime_ns, Last-Modified value, gzip body)}
+_gzip_cache = {}
+
+
+def gzipped_file(path):
+    """
+    Compressed copy of a UI file, made once per file version.
+    Returns (Last-Modified, body), or None if compression doesn't help.
+    """
+    file = STATIC_DIR / path.lstrip('/')
+    st = os.stat(file)
+    entry = _gzip_cache.get(path)
+    if entry is None or entry[0] != st.st_mtime_ns:
+        data = file.read_bytes()
+        body = gzip.compress(data, 9, mtime=0)
+        entry = (st.st_mtime_ns, formatdate(st.st_mtime, usegmt=True),
+                 body if len(body) < len(data) else None)
+        _gzip_cache[path] = entry
+    return None if entry[2] is None else entry[1:]
+
+
+# Caps concurrently running handlers across all server threads
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# Open /api/status/stream connections; these live long, so don't take request slots
+_stream_slots = threading.BoundedSemaphore(MAX_STATUS_STREAMS)
+
+
+def bounded(method):
+    """Run a request method only while holding one of the request slots"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with _request_slots:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class FanControlHandler(SimpleHTTPRequestHandler):
+    # Keep-alive: the dashboard polls /api/status every few seconds
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections release their thread after this many seconds
+    timeout = 30
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=str(STATIC_DIR), **kwargs)
     
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
     def log_message(self, format, *args):
         pass
     
+    # path -> handler method name
+    GET_ROUTES = {
+        '/api/status': 'handle_status',
+        '/api/history': 'handle_history',
+        '/api/config': 'handle_get_config',
+        '/api/fans/scan': 'handle_fans_scan',
+        '/api/fans/rpm': 'handle_fans_rpm',
+        '/api/gpu/scan': 'handle_gpu_scan',
+        '/api/gpu/fans': 'handle_gpu_fans',
+        '/api/cpu/scan': 'handle_cpu_scan',
+        '/api/sensors/scan': 'handle_sensors_scan',
+        '/api/sensors': 'handle_get_sensors',
+    }
+    POST_ROUTES = {
+        '/api/config': 'handle_post_config',
+        '/api/restart': 'handle_restart',
+        '/api/override': 'handle_override',
+        '/api/fans/test': 'handle_fans_test',
+        '/api/fan-groups': 'handle_post_fan_group',
+        '/api/gpu/test': 'handle_gpu_test',
+        '/api/gpu-group': 'handle_post_gpu_group',
+        '/api/cpu/sensor': 'handle_post_cpu_sensor',
+        '/api/sensors': 'handle_post_sensor',
+    }
+    
     def parse_query(self):
-        if '?' in self.path:
-            path, query = self.path.split('?', 1)
-            params = dict(p.split('=') for p in query.split('&') if '=' in p)
-            return path, params
-        return self.path, {}
+        """Split self.path into path and {name: first value} query params"""
+        url = urlsplit(self.path)
+        params = {}
+        for name, value in parse_qsl(url.query):
+            params.setdefault(name, value)
+        return url.path, params
     
     def do_GET(self):
-        path, params = self.parse_query()
-        
-        if path == '/api/status':
-            self.handle_status()
-        elif path == '/api/history':
-            self.handle_history(params)
-        elif path == '/api/config':
-            self.handle_get_config()
-
-        elif path == '/api/fans/scan':
-            self.handle_fans_scan()
-        elif path == '/api/fans/rpm':
-            self.handle_fans_rpm()
-        elif path == '/api/gpu/scan':
-            self.handle_gpu_scan()
-        elif path == '/api/gpu/fans':
-            self.handle_gpu_fans()
-        elif path == '/api/cpu/scan':
-            self.handle_cpu_scan()
-        elif path == '/api/sensors/scan':
-            self.handle_sensors_scan()
-        elif path == '/api/sensors':
-            self.handle_get_sensors()
+        path, self.params = self.parse_query()
+        if path == '/api/status/stream':
+            self.handle_status_stream()
         else:
-            if not Path(str(STATIC_DIR) + path).exists() and not path.startswith('/api/'):
-                self.path = '/index.html'
-            super().do_GET()
+            self.dispatch_get(path)
     
-    def do_POST(self):
-        path, _ = self.parse_query()
-        
-        if path == '/api/config':
-            self.handle_post_config()
-        elif path == '/api/restart':
-            self.handle_restart()
-        elif path == '/api/override':
-            self.handle_override()
-
-        elif path == '/api/fans/test':
-            self.handle_fans_test()
-        elif path == '/api/fan-groups':
-            self.handle_post_fan_group()
-        elif path == '/api/gpu/test':
-            self.handle_gpu_test()
-        elif path == '/api/gpu-group':
-            self.handle_post_gpu_group()
-        elif path == '/api/cpu/sensor':
-            self.handle_post_cpu_sensor()
-        elif path == '/api/sensors':
-            self.handle_post_sensor()
+    @bounded
+    def dispatch_get(self, path):
+        handler = self.GET_ROUTES.get(path)
+        if handler:
+            getattr(self, handler)()
         else:
-            self.send_response(404)
+            # SPA fallback: anything that isn't a UI file or API path gets index.html
+            if path not in static_files() and not path.startswith('/api/'):
+                path = self.path = '/index.html'
+            if not self.send_gzipped(path):
+                super().do_GET()
+    
+    def send_gzipped(self, path):
+        """Send a UI file gzip-compressed if the client accepts it; False if not sent"""
+        if (not path.endswith(COMPRESSIBLE_SUFFIXES) or path not in static_files()
+                or 'gzip' not in self.headers.get('Accept-Encoding', '')):
+            return False
+        try:
+            entry = gzipped_file(path)
+        except OSError:
+            return False
+        if entry is None:
+            return False
+        last_modified, body = entry
+        
+        if self.headers.get('If-Modified-Since') == last_modified:
+            self.send_response(304)
             self.end_headers()
+            return True
+        
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        self.wfile.write(body)
+        return True
     
+    def copyfile(self, source, outputfile):
+        """Uncompressed files go from the page cache to the socket via sendfile()"""
+        self.connection.sendfile(source)
+    
+    @bounded
+    def do_POST(self):
+        path, self.params = self.parse_query()
+        
+        handler = self.POST_ROUTES.get(path)
+        if not handler:
+            self.send_empty(404)
+            return
+        
+        # Checked once here so handlers can read the body unguarded
+        try:
+            self.content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            self.send_empty(400)
+            return
+        if not 0 <= self.content_length <= MAX_POST_BYTES:
+            self.send_empty(413 if self.content_length > 0 else 400)
+            return
+        
+        getattr(self, handler)()
+    
+    @bounded
     def do_DELETE(self):
         path = self.path.split('?')[0]
         
@@ -158,84 +503,173 @@ class FanControlHandler(SimpleHTTPRequestHandler):
             sensor_id = path.split('/')[-1]
             self.handle_delete_sensor(sensor_id)
         else:
-            self.send_response(404)
-            self.send_cors_headers()
-            self.end_headers()
+            self.send_empty(404)
     
     def do_OPTIONS(self):
         self.send_response(204)
         self.send_cors_headers()
         self.end_headers()
     
+    def read_json(self):
+        """Parse the JSON request body (its size was validated by do_POST)"""
+        return fastjson.loads(self.rfile.read(self.content_length))
+    
     def send_cors_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
     
     def send_json(self, data, status=200):
+        self.send_json_bytes(fastjson.dumps(data), status)
+    
+    def send_json_bytes(self, body, status=200):
+        """Send an already serialized JSON body"""
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_json_array(self, items):
+        """
+        Send an iterable as a JSON array using chunked transfer encoding.
+        Items are serialized one at a time, so neither the full list of
+        rows nor the full body is ever held in memory.
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_cors_headers()
+        self.end_headers()
+        
+        write = self.wfile.write
+        def send_chunk(parts):
+            chunk = b''.join(parts)
+            write(b'%x\r\n%b\r\n' % (len(chunk), chunk))
+        
+        parts = []
+        size = 0
+        separator = b'['
+        for item in items:
+            body = fastjson.dumps(item)
+            parts.append(separator)
+            parts.append(body)
+            separator = b','
+            size += len(body) + 1
+            if size >= STREAM_CHUNK_SIZE:
+                send_chunk(parts)
+                parts = []
+                size = 0
+        if separator == b'[':
+            # No items
+            parts.append(separator)
+        parts.append(b']')
+        send_chunk(parts)
+        write(b'0\r\n\r\n')
+    
+    def send_empty(self, status):
+        """Send a bodyless response and close, since the request body was not read"""
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.send_header('Connection', 'close')
         self.send_cors_headers()
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
     
     def handle_status(self):
-        with current_state['lock']:
-            data = current_state['data']
+        body = current_state['status_body']
         
-        if data is None:
+        if body is None:
             self.send_json({'error': 'Not ready'}, 503)
             return
         
-        self.send_json(data)
+        self.send_json_bytes(body)
     
-    def handle_history(self, params):
-        range_map = {'1m': 60, '5m': 300, '30m': 1800, '1h': 3600, '6h': 21600, '1d': 86400, '1w': 604800, '1mo': 2592000}
+    def handle_status_stream(self):
+        """Push every published status as a Server-Sent Event"""
+        if not _stream_slots.acquire(blocking=False):
+            self.send_json({'error': 'Too many status streams'}, 503)
+            return
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.send_cors_headers()
+            self.end_headers()
+            self.close_connection = True
+            
+            sent = None
+            while True:
+                with _status_changed:
+                    _status_changed.wait_for(lambda: current_state['status_body'] is not sent,
+                                             timeout=STREAM_KEEPALIVE)
+                body = current_state['status_body']
+                if body is None or body is sent:
+                    self.wfile.write(b': keep-alive\n\n')
+                else:
+                    self.wfile.write(b'data: ' + body + b'\n\n')
+                    sent = body
+                self.wfile.flush()
+        except OSError:
+            # Client went away
+            pass
+        finally:
+            _stream_slots.release()
+    
+    def handle_history(self):
+        params = self.params
         range_key = params.get('range', '30m')
-        range_seconds = range_map.get(range_key, 1800)
+        range_seconds = HISTORY_RANGES.get(range_key, 1800)
         
         max_entries = min(range_seconds // LOG_INTERVAL + 10, 10000)
-        entries = get_history_from_logs(max_entries)
         
         now = time.time()
         cutoff_time = now - range_seconds
+        seed_history_ring()
+        with current_state['lock']:
+            ring = list(history_ring)
         
-        chart_data = []
-        for e in entries:
-            ts = e.get('timestamp', 0)
-            if ts and ts < cutoff_time:
-                continue
-            
-            chart_data.append({
-                'time': e.get('time', ''),
-                'timestamp': ts,
-                'cpu': e.get('temps', {}).get('cpu', 0),
-                'gpu': e.get('temps', {}).get('gpu', 0),
-                'temps': e.get('temps', {}),
-                'sensors': e.get('sensors', []),
-                'logic': e.get('logic', {}),
-                'fans': {f['id']: f.get('pwmOrPct', 0) for f in e.get('fans', [])}
-            })
+        # Disk is only needed until the ring reaches back past the cutoff
+        if ring and ring[0].get('timestamp', now) <= cutoff_time:
+            entries = ring[-max_entries:]
+        else:
+            entries = read_history(max_entries, cutoff_time)
+        
+        # Keep every step-th entry, aligned so the newest one is always included
+        step = -(-len(entries) // HISTORY_MAX_POINTS)
+        if step > 1:
+            entries = entries[(len(entries) - 1) % step::step]
+        
+        def chart_rows():
+            for e in entries:
+                ts = e.get('timestamp', 0)
+                if ts and ts < cutoff_time:
+                    continue
+                
+                temps = e.get('temps') or {}
+                yield {
+                    'time': e.get('time', ''),
+                    'timestamp': ts,
+                    'cpu': temps.get('cpu', 0),
+                    'gpu': temps.get('gpu', 0),
+                    'temps': temps,
+                    'sensors': e.get('sensors') or [],
+                    'logic': e.get('logic') or {},
+                    'fans': {f['id']: f.get('pwmOrPct', 0) for f in e.get('fans') or ()}
+                }
         
-        self.send_json(chart_data)
+        # Rows are built and serialized as they are sent
+        self.send_json_array(chart_rows())
     
     def handle_get_config(self):
         self.send_json(config.get_current_config())
     
     def handle_post_config(self):
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            new_config = json.loads(body.decode())
-            
-            # Update runtime overrides - support both old and new format
-            if 'override' in new_config:
-                for group_id, ovr in new_config['override'].items():
-                    config.runtime_override[group_id] = {
-                        'enabled': ovr.get('enabled', False),
-                        'mode': str(ovr.get('mode', 0))
-                    }
+            new_config = self.read_json()
             
+            # Also applies new_config['override'] to the runtime overrides
             config.save_config(new_config)
             self.send_json({'success': True, 'message': 'Config saved'})
         except Exception as e:
@@ -245,32 +679,21 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     
     def handle_override(self):
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode())
+            data = self.read_json()
             
             override_type = data.get('type')
             
             # Validate that group exists in config
-            valid_group_ids = [g['id'] for g in config.current_config.get('fan_groups', [])]
-            if override_type not in valid_group_ids:
+            if override_type not in config.valid_group_ids():
                 self.send_json({'success': False, 'error': f'Invalid group: {override_type}'}, 400)
                 return
             
-            # Initialize override for group if not exists
-            if override_type not in config.runtime_override:
-                config.runtime_override[override_type] = {'enabled': False, 'mode': '0'}
-            
-            config.runtime_override[override_type]['enabled'] = data.get('enabled', False)
-            if 'mode' in data:
-                config.runtime_override[override_type]['mode'] = str(data['mode'])
-            
-            if data.get('save', False):
-                config.save_config()
+            config.set_override(override_type, data.get('enabled', False),
+                                data.get('mode'), save=data.get('save', False))
             
             self.send_json({
                 'success': True, 
-                'override': config.runtime_override
+                'override': config.get_snapshot()[2]
             })
         except Exception as e:
             import traceback
@@ -281,7 +704,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
         try:
             self.send_json({'success': True, 'message': 'Restarting...'})
             threading.Thread(
-                target=lambda: (time.sleep(0.5), os.system('systemctl restart fan-control')),
+                target=lambda: (time.sleep(0.5), spawn.popen(['systemctl', 'restart', 'fan-control'])),
                 daemon=True
             ).start()
         except Exception as e:
@@ -300,6 +723,9 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_fans_scan(self):
         """Return all detected fans and PWM controllers (System + GPU)"""
         try:
+            # An explicit scan always re-probes (scan_unified also refreshes the RPM layout)
+            driver_check.invalidate()
+            gpu_scanner.scan_nvidia_gpus.cache_clear()
             result = fan_scanner.scan_unified()
             self.send_json(result)
         except Exception as e:
@@ -316,9 +742,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_fans_test(self):
         """Test a PWM controller by setting its value"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode())
+            data = self.read_json()
             
             pwm_path = data.get('pwm_path', '')
             value = int(data.get('value', 0))
@@ -335,9 +759,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_post_fan_group(self):
         """Handle adding a new fan group from wizard"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode())
+            data = self.read_json()
             
             # Validate required fields
             required = ['id', 'name', 'temp_sources', 'fans']
@@ -384,6 +806,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_gpu_scan(self):
         """Return all detected NVIDIA GPUs and their fans"""
         try:
+            gpu_scanner.scan_nvidia_gpus.cache_clear()
             result = gpu_scanner.scan_all()
             self.send_json(result)
         except Exception as e:
@@ -412,9 +835,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_gpu_test(self):
         """Test a GPU fan by setting it to a specific speed"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode())
+            data = self.read_json()
             
             fan_index = int(data.get('fan_index', 0))
             target_pct = int(data.get('target_pct', 50))
@@ -429,9 +850,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_post_gpu_group(self):
         """Handle adding a GPU group from UI"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode())
+            data = self.read_json()
             
             # Build GPU group configuration
             gpu_config = {
@@ -487,9 +906,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_post_cpu_sensor(self):
         """Save selected CPU sensor path"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode())
+            data = self.read_json()
             
             sensor_path = data.get('path')
             if not sensor_path:
@@ -497,9 +914,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
                 return
             
             # Update config with new CPU sensor path
-            current = config.get_current_config()
-            current['cpu_sensor_path'] = sensor_path
-            config.save_config(current)
+            config.update_config(lambda cfg: cfg.update(cpu_sensor_path=sensor_path))
             
             self.send_json({
                 'success': True,
@@ -512,6 +927,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_sensors_scan(self):
         """Scan all available temperature sources"""
         try:
+            sensor_manager.scan_drive_sensors.cache_clear()
             sources = sensor_manager.scan_all_sources()
             self.send_json({
                 'success': True,
@@ -531,14 +947,18 @@ class FanControlHandler(SimpleHTTPRequestHandler):
             current = config.get_current_config()
             sensors_config = current.get('sensors', [])
             
-            # Get current values for each sensor
-            sensors_with_values = []
-            for sensor in sensors_config:
-                value = sensor_manager.read_sensor_value(sensor)
-                sensors_with_values.append({
-                    **sensor,
-                    'current_value': value
-                })
+            # Get current values for each sensor; a GPU read without NVML forks
+            # nvidia-smi, so sensors are read in parallel
+            if len(sensors_config) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(sensors_config), MAX_SCAN_WORKERS)) as pool:
+                    values = list(pool.map(sensor_manager.read_sensor_value, sensors_config))
+            else:
+                values = [sensor_manager.read_sensor_value(s) for s in sensors_config]
+            
+            sensors_with_values = [
+                {**sensor, 'current_value': value}
+                for sensor, value in zip(sensors_config, values)
+            ]
             
             self.send_json({
                 'success': True,
@@ -550,9 +970,7 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_post_sensor(self):
         """Create or update a sensor"""
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode())
+            data = self.read_json()
             
             # Validate required fields
             if not data.get('id') or not data.get('name') or not data.get('type'):
@@ -564,26 +982,17 @@ class FanControlHandler(SimpleHTTPRequestHandler):
                 self.send_json({'success': False, 'error': 'Invalid sensor configuration'}, 400)
                 return
             
-            # Get current config
-            current = config.get_current_config()
-            if 'sensors' not in current:
-                current['sensors'] = []
-            
-            # Check if sensor already exists (update) or new
-            existing_idx = None
-            for i, s in enumerate(current['sensors']):
-                if s['id'] == data['id']:
-                    existing_idx = i
-                    break
-            
-            if existing_idx is not None:
-                current['sensors'][existing_idx] = data
-                message = f"Sensor '{data['name']}' updated"
-            else:
-                current['sensors'].append(data)
-                message = f"Sensor '{data['name']}' created"
+            def change(cfg):
+                sensors = cfg.setdefault('sensors', [])
+                # Check if sensor already exists (update) or new
+                existing_idx = config.sensor_index().get(data['id'])
+                if existing_idx is not None:
+                    sensors[existing_idx] = data
+                    return f"Sensor '{data['name']}' updated"
+                sensors.append(data)
+                return f"Sensor '{data['name']}' created"
             
-            config.save_config(current)
+            message = config.update_config(change)
             
             self.send_json({
                 'success': True,
@@ -596,19 +1005,20 @@ class FanControlHandler(SimpleHTTPRequestHandler):
     def handle_delete_sensor(self, sensor_id: str):
         """Delete a sensor by ID"""
         try:
-            current = config.get_current_config()
-            sensors = current.get('sensors', [])
+            def change(cfg):
+                sensors = cfg.get('sensors', [])
+                # Find and remove sensor
+                new_sensors = [s for s in sensors if s['id'] != sensor_id]
+                if len(new_sensors) == len(sensors):
+                    raise LookupError(sensor_id)
+                cfg['sensors'] = new_sensors
             
-            # Find and remove sensor
-            new_sensors = [s for s in sensors if s['id'] != sensor_id]
-            
-            if len(new_sensors) == len(sensors):
+            try:
+                config.update_config(change)
+            except LookupError:
                 self.send_json({'success': False, 'error': f"Sensor '{sensor_id}' not found"}, 404)
                 return
             
-            current['sensors'] = new_sensors
-            config.save_config(current)
-            
             self.send_json({
                 'success': True,
                 'message': f"Sensor '{sensor_id}' deleted"
@@ -617,7 +1027,13 @@ class FanControlHandler(SimpleHTTPRequestHandler):
             self.send_json({'success': False, 'error': str(e)}, 500)
 
 
+class FanControlServer(ThreadingHTTPServer):
+    """Thread-per-connection server so slow handlers don't block /api/status"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+
 def start_http_server():
     """Start the HTTP server"""
-    server = HTTPServer(('0.0.0.0', HTTP_PORT), FanControlHandler)
+    server = FanControlServer(('0.0.0.0', HTTP_PORT), FanControlHandler)
     server.serve_forever()
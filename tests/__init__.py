@@ -0,0 +1,11 @@
+"""
+Unit tests. Run from the repository root with: python -m pytest (or python -m unittest)
+
+Importing fancontrol loads (and may create) the config file, so point it
+at a temporary location before any test module imports the package.
+"""
+import os
+import tempfile
+
+os.environ.setdefault('FAN_CONTROL_CONFIG',
+                      os.path.join(tempfile.mkdtemp(prefix='fancontrol-test-'), 'fan_config.json'))
@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from fancontrol.cache import ttl_cache
+
+
+class TTLCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        @ttl_cache(30)
+        def scan(arg=None):
+            self.calls.append(arg)
+            return [arg, len(self.calls)]
+        self.scan = scan
+
+    def test_reused_per_arguments(self):
+        self.assertIs(self.scan(), self.scan())
+        self.scan(1)
+        self.scan(1)
+        self.assertEqual(self.calls, [None, 1])
+
+    def test_expires(self):
+        now = time.monotonic()
+        with mock.patch('fancontrol.cache.time.monotonic', return_value=now):
+            self.scan()
+        with mock.patch('fancontrol.cache.time.monotonic', return_value=now + 31):
+            self.assertEqual(self.scan(), [None, 2])
+
+    def test_cache_clear_forces_recompute(self):
+        self.scan()
+        self.scan.cache_clear()
+        self.assertEqual(self.scan(), [None, 2])
+
+    def test_concurrent_callers_share_one_computation(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        @ttl_cache(30)
+        def slow():
+            self.calls.append(None)
+            started.set()
+            release.wait(5)
+            return object()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow())) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for t in threads[1:]:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from fancontrol import config
+
+
+class UpdateConfigTest(unittest.TestCase):
+    def setUp(self):
+        config.runtime_override.clear()
+        config.save_config({'fan_groups': [], 'override': {}, 'sensors': [], 'drives': {'monitored': []}})
+
+    def test_concurrent_updates_are_not_lost(self):
+        def add(i):
+            config.update_config(lambda cfg: cfg['sensors'].append({'id': f's{i}'}))
+        threads = [threading.Thread(target=add, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        ids = sorted(s['id'] for s in config.current_config['sensors'])
+        self.assertEqual(ids, sorted(f's{i}' for i in range(20)))
+
+    def test_snapshot_is_not_changed_by_later_updates(self):
+        _, snapshot, _ = config.get_snapshot()
+        config.update_config(lambda cfg: cfg['sensors'].append({'id': 'new'}))
+        config.add_fan_group({'id': 'g1', 'name': 'G1'})
+        self.assertEqual(snapshot['sensors'], [])
+        self.assertEqual(snapshot['fan_groups'], [])
+        self.assertEqual([g['id'] for g in config.current_config['fan_groups']], ['g1'])
+
+    def test_aborted_update_is_not_saved(self):
+        revision = config.config_revision
+
+        def change(cfg):
+            cfg['sensors'].append({'id': 'x'})
+            raise LookupError
+        with self.assertRaises(LookupError):
+            config.update_config(change)
+        self.assertEqual(config.config_revision, revision)
+        self.assertEqual(config.current_config['sensors'], [])
+
+    def test_fan_groups(self):
+        config.add_fan_group({'id': 'g1', 'name': 'G1'})
+        with self.assertRaises(ValueError):
+            config.add_fan_group({'id': 'g1', 'name': 'again'})
+        self.assertEqual(config.valid_group_ids(), {'g1'})
+        self.assertEqual(config.runtime_override['g1'], {'enabled': False, 'mode': '0'})
+        self.assertTrue(config.remove_fan_group('g1'))
+        self.assertFalse(config.remove_fan_group('g1'))
+        self.assertEqual(config.valid_group_ids(), set())
+        self.assertNotIn('g1', config.runtime_override)
+
+    def test_saved_override_is_kept(self):
+        config.add_fan_group({'id': 'g1', 'name': 'G1'})
+        config.set_override('g1', True, 2, save=True)
+        self.assertEqual(config.runtime_override['g1'], {'enabled': True, 'mode': '2'})
+        self.assertEqual(config.current_config['override']['g1'], {'enabled': True, 'mode': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fancontrol import controllers
+from fancontrol.controllers import FanCurve, GPUCommandBatch, GPUFanController, SystemFanController
+
+
+class FanCurveTest(unittest.TestCase):
+    def test_needs_two_points(self):
+        curve = FanCurve()
+        self.assertIsNone(curve.estimate(1000))
+        curve.record(100, 1000)
+        self.assertIsNone(curve.estimate(1000))
+
+    def test_interpolates_within_learned_range(self):
+        curve = FanCurve()
+        curve.record(100, 1000)
+        curve.record(200, 2000)
+        curve.record(150, 0)  # stalled reading is ignored
+        self.assertEqual(curve.estimate(1500), 150)
+
+    def test_clamped_to_learned_outputs(self):
+        curve = FanCurve()
+        curve.record(200, 1800)
+        curve.record(255, 2000)
+        # Linear extrapolation would give -75
+        self.assertEqual(curve.estimate(800), 200)
+        self.assertEqual(curve.estimate(2500), 255)
+
+    def test_flat_segment(self):
+        curve = FanCurve()
+        curve.record(100, 1000)
+        curve.record(200, 1000)
+        self.assertIsNone(curve.estimate(1500))
+
+
+class GPUCommandBatchTest(unittest.TestCase):
+    def test_runs_immediately_outside_a_tick(self):
+        batch = GPUCommandBatch()
+        with mock.patch.object(GPUCommandBatch, '_send') as send:
+            batch.run(':0', ['a'])
+        send.assert_called_once_with(':0', ['a'])
+
+    def test_one_call_per_display_per_tick(self):
+        batch = GPUCommandBatch()
+        with mock.patch.object(GPUCommandBatch, '_send') as send:
+            batch.begin()
+            batch.run(':0', ['a', 'b'])
+            batch.run(':0', ['a', 'c'])
+            batch.run(':1', ['d'])
+            send.assert_not_called()
+            batch.flush()
+        self.assertEqual(sorted(send.call_args_list),
+                         sorted([mock.call(':0', ['a', 'b', 'c']), mock.call(':1', ['d'])]))
+
+
+class GPUFanControllerTest(unittest.TestCase):
+    def setUp(self):
+        # No NVML: every write goes to nvidia-settings through gpu_batch
+        patches = [
+            mock.patch.object(controllers.nvml, 'set_fan_speed', return_value=None),
+            mock.patch.object(controllers.nvml, 'set_default_fan_speed', return_value=None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        run = mock.patch.object(controllers.gpu_batch, 'run')
+        self.run_mock = run.start()
+        self.addCleanup(run.stop)
+        self.ctrl = GPUFanController({'gpu_index': 0, 'fans': [0]})
+        self.run_mock.reset_mock()
+        self.rpm = 1000
+        rpm = mock.patch.object(GPUFanController, 'get_rpm', side_effect=lambda: self.rpm)
+        rpm.start()
+        self.addCleanup(rpm.stop)
+
+    def written(self):
+        """Fan speeds sent to nvidia-settings, in order"""
+        speeds = []
+        for call in self.run_mock.call_args_list:
+            for assignment in call.args[1]:
+                if 'GPUTargetFanSpeed=' in assignment:
+                    speeds.append(int(assignment.split('=')[1]))
+        return speeds
+
+    def test_each_closed_loop_step_is_written(self):
+        self.ctrl.set_target_rpm(2000)
+        for _ in range(4):
+            self.ctrl.update()
+        self.assertEqual(self.written(), [20, 25, 30, 35])
+        self.assertEqual(self.ctrl.current_pct, 35)
+
+    def test_curve_jump_is_written(self):
+        self.ctrl.curve.record(40, 1000)
+        self.ctrl.curve.record(80, 2000)
+        self.ctrl.set_target_rpm(1500)
+        self.ctrl.update()
+        self.assertEqual(self.written(), [60])
+
+    def test_unchanged_speed_is_reasserted_only_after_interval(self):
+        self.ctrl.set_speed_pct(50)
+        self.ctrl.set_speed_pct(50)
+        self.assertEqual(self.written(), [50])
+        self.ctrl.last_write_time -= controllers.GPU_REASSERT_INTERVAL
+        self.ctrl.set_speed_pct(50)
+        self.assertEqual(self.written(), [50, 50])
+
+    def test_auto_mode_reasserted_periodically(self):
+        self.ctrl.set_speed_pct(0)
+        self.run_mock.assert_not_called()
+        self.ctrl.last_write_time -= controllers.GPU_REASSERT_INTERVAL
+        self.ctrl.set_speed_pct(0)
+        self.run_mock.assert_called_once_with(':0', ['[gpu:0]/GPUFanControlState=0'])
+        self.ctrl.set_speed_pct(0)
+        self.run_mock.assert_called_once()
+
+    def test_settled_within_gpu_tolerance(self):
+        self.ctrl.set_target_rpm(1000 + controllers.GPU_TOLERANCE)
+        self.ctrl.update()
+        self.assertTrue(self.ctrl.settled())
+        self.assertEqual(self.written(), [])
+        self.ctrl.set_target_rpm(1001 + controllers.GPU_TOLERANCE)
+        self.ctrl.update()
+        self.assertFalse(self.ctrl.settled())
+
+    def test_reset_after_manual(self):
+        self.ctrl.set_speed_pct(50)
+        self.run_mock.reset_mock()
+        self.ctrl.set_speed_pct(0)
+        self.run_mock.assert_called_once_with(':0', ['[gpu:0]/GPUFanControlState=0'])
+        # Next manual speed is written even though it equals the last one
+        self.ctrl.set_speed_pct(50)
+        self.assertEqual(self.written(), [50])
+
+
+class SystemFanControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pwm = os.path.join(self.dir, 'pwm1')
+        self.fan = os.path.join(self.dir, 'fan1_input')
+        self.write(self.pwm, 100)
+        self.write(self.fan, 1000)
+
+    @staticmethod
+    def write(path, value):
+        with open(path, 'w') as f:
+            f.write(f'{value}\n')
+
+    def read(self, path):
+        with open(path) as f:
+            return int(f.read())
+
+    def test_steps_towards_target(self):
+        ctrl = SystemFanController('fan1', self.pwm, self.fan)
+        self.assertEqual(ctrl.current_pwm, 100)
+        with open(self.pwm + '_enable') as f:
+            self.assertEqual(f.read(), '1')
+        ctrl.target_rpm = 1500
+        ctrl.update()
+        self.assertEqual(ctrl.current_pwm, 100 + 2 * controllers.STEP_SIZE)
+        self.assertEqual(self.read(self.pwm), ctrl.current_pwm)
+
+    def test_settled_within_tolerance(self):
+        ctrl = SystemFanController('fan1', self.pwm, self.fan)
+        ctrl.target_rpm = 1000 + controllers.TOLERANCE
+        ctrl.update()
+        self.assertEqual(ctrl.current_pwm, 100)
+        self.assertEqual(ctrl.curve.points, {100: 1000})
+        self.assertTrue(ctrl.settled())
+        ctrl.target_rpm += 1
+        self.assertFalse(ctrl.settled())
+
+    def test_target_below_learned_range_does_not_stop_fan(self):
+        ctrl = SystemFanController('fan1', self.pwm, self.fan)
+        ctrl.curve.record(200, 1800)
+        ctrl.curve.record(255, 2000)
+        ctrl.target_rpm = 800
+        ctrl.update()
+        self.assertEqual(ctrl.current_pwm, 200)
+        self.assertEqual(self.read(self.pwm), 200)
+
+    def test_missing_pwm_is_skipped(self):
+        ctrl = SystemFanController('fan1', os.path.join(self.dir, 'pwm9'), self.fan)
+        self.assertFalse(ctrl.healthy)
+        ctrl.target_rpm = 2000
+        ctrl.update()
+        self.assertEqual(ctrl.current_rpm, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import subprocess
+import unittest
+from unittest import mock
+
+from fancontrol import drives
+
+SMART_JSON = b'{"serial_number":"S2","temperature":{"current":41}}'
+SDA = {'name': 'sda', 'serial': 'S1', 'model': 'Disk ', 'size': '1T', 'tran': 'sata', 'rota': True}
+
+
+class ScanDriveTest(unittest.TestCase):
+    def setUp(self):
+        self.args = ()
+
+    def scan(self, dev, output=SMART_JSON, **kwargs):
+        with mock.patch.object(drives.spawn, 'check_output', **kwargs) as check_output:
+            if 'side_effect' not in kwargs:
+                check_output.return_value = output
+            entry = drives._scan_drive(dev, *self.args)
+        return entry, check_output
+
+    def test_probes_wanted_drive(self):
+        entry, check_output = self.scan(SDA)
+        check_output.assert_called_once()
+        self.assertEqual(entry, {'serial': 'S1', 'device': '/dev/sda', 'model': 'Disk',
+                                 'size': '1T', 'type': 'HDD', 'temperature': 41})
+
+    def test_unwanted_drive_listed_without_probe(self):
+        self.args = ({'other'},)
+        entry, check_output = self.scan(SDA)
+        check_output.assert_not_called()
+        self.assertEqual(entry['serial'], 'S1')
+        self.assertIsNone(entry['temperature'])
+
+    def test_identity_only_probes_drives_without_serial(self):
+        self.args = (None, False)
+        entry, check_output = self.scan(SDA)
+        check_output.assert_not_called()
+        entry, check_output = self.scan(dict(SDA, serial=None))
+        check_output.assert_called_once()
+        self.assertEqual(entry['serial'], 'S2')
+
+    def test_smartctl_error_status_still_parsed(self):
+        error = subprocess.CalledProcessError(4, 'smartctl', output=SMART_JSON)
+        entry, _ = self.scan(SDA, side_effect=error)
+        self.assertEqual(entry['temperature'], 41)
+
+    def test_failures_leave_temperature_empty(self):
+        for effect in (OSError('no smartctl'), subprocess.TimeoutExpired('smartctl', 5)):
+            entry, _ = self.scan(SDA, side_effect=effect)
+            self.assertIsNone(entry['temperature'])
+        for output in (b'not json', b'[1]', b'{"temperature": 5}'):
+            entry, _ = self.scan(SDA, output=output)
+            self.assertIsNone(entry['temperature'])
+
+    def test_skipped_devices(self):
+        self.assertIsNone(drives._scan_drive({'name': 'loop0'}))
+        self.assertIsNone(drives._scan_drive({'name': 'sr0'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
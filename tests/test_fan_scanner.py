@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fancontrol import fan_scanner
+
+
+class SetPwmValueTest(unittest.TestCase):
+    def setUp(self):
+        fan_scanner.reset_enable_cache()
+        self.pwm = os.path.join(tempfile.mkdtemp(), 'pwm1')
+        for path, value in ((self.pwm, '100'), (self.pwm + '_enable', '2')):
+            with open(path, 'w') as f:
+                f.write(value)
+
+    def enable(self):
+        with open(self.pwm + '_enable') as f:
+            return f.read()
+
+    def test_manual_mode_enabled_once(self):
+        self.assertTrue(fan_scanner.set_pwm_value(self.pwm, 300))
+        with open(self.pwm) as f:
+            self.assertEqual(f.read(), '255')
+        self.assertEqual(self.enable(), '1')
+        with open(self.pwm + '_enable', 'w') as f:
+            f.write('2')
+        fan_scanner.set_pwm_value(self.pwm, 120)
+        self.assertEqual(self.enable(), '2')
+
+    def test_rescan_reenables_manual_mode(self):
+        fan_scanner.set_pwm_value(self.pwm, 120)
+        # e.g. the BIOS handed the PWM back to automatic control
+        with open(self.pwm + '_enable', 'w') as f:
+            f.write('2')
+        with mock.patch.object(fan_scanner, 'scan_hwmon_devices', return_value=[]):
+            fan_scanner.scan_all()
+        fan_scanner.set_pwm_value(self.pwm, 130)
+        self.assertEqual(self.enable(), '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
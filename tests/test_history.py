@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fancontrol.web import server
+
+
+class ReverseLinesTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_lines_across_block_boundaries(self):
+        lines = [f'line {i}'.encode() * (i % 4 + 1) for i in range(50)]
+        self.write(b'\n'.join(lines) + b'\n')
+        for block_size in (1, 7, 64, 1 << 16):
+            self.assertEqual(list(server.reverse_lines(self.path, block_size)), lines[::-1])
+
+    def test_blank_lines_and_missing_newline(self):
+        self.write(b'a\n\n  \nb')
+        self.assertEqual(list(server.reverse_lines(self.path, 2)), [b'b', b'a'])
+
+    def test_end_limits_the_read(self):
+        self.write(b'a\nb\nc\n')
+        self.assertEqual(list(server.reverse_lines(self.path, end=4)), [b'b', b'a'])
+
+
+class HistorySeedTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        patches = [
+            mock.patch.object(server, 'LOG_DIR', self.dir),
+            mock.patch.object(server, '_ring_seeded', False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        saved = list(server.history_ring)
+        self.addCleanup(lambda: (server.history_ring.clear(), server.history_ring.extend(saved)))
+        server.history_ring.clear()
+
+    def log(self, name, timestamps):
+        with open(self.dir / name, 'w') as f:
+            for ts in timestamps:
+                f.write(json.dumps({'timestamp': ts}) + '\n')
+
+    def test_logs_read_newest_first_across_rotation(self):
+        self.log('history.jsonl.1', [1, 2, 3])
+        self.log('history.jsonl', [4, 5])
+        entries = server.get_history_from_logs(4)
+        self.assertEqual([e['timestamp'] for e in entries], [2, 3, 4, 5])
+
+    def test_seed_keeps_recorded_entries_without_duplicates(self):
+        self.log('history.jsonl.1', [1, 2])
+        self.log('history.jsonl', [3, 4])
+        # Recorded after startup, and also already written to the log
+        server.record_history({'timestamp': 4})
+        server.record_history({'timestamp': 5})
+        server.seed_history_ring()
+        self.assertEqual([e['timestamp'] for e in server.history_ring], [1, 2, 3, 4, 5])
+        # Only seeded once
+        self.log('history.jsonl', [3, 4, 6])
+        server.seed_history_ring()
+        self.assertEqual(len(server.history_ring), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from fancontrol import config, sensor_manager
+from fancontrol.sensor_manager import SmartPoller
+
+
+class SmartPollerTest(unittest.TestCase):
+    def setUp(self):
+        details = mock.patch('fancontrol.sensor_manager.get_drive_details',
+                             side_effect=lambda dev: {'device': dev})
+        self.details = details.start()
+        self.addCleanup(details.stop)
+        self.poller = SmartPoller()
+        # Keep the background thread from starting
+        self.poller._thread = object()
+
+    def test_unrequested_drives_are_pruned(self):
+        self.poller.get('/dev/sda')
+        self.poller.get('/dev/sdb')
+        self.poller.refresh()
+        self.assertEqual(set(self.poller.snapshot()), {'/dev/sda', '/dev/sdb'})
+
+        self.poller.get('/dev/sda')  # cache hit still counts as a request
+        self.details.reset_mock()
+        self.poller.refresh()
+        self.details.assert_called_once_with('/dev/sda')
+        self.assertEqual(set(self.poller.snapshot()), {'/dev/sda'})
+
+        self.poller.refresh()
+        self.assertEqual(self.poller.snapshot(), {})
+
+    def test_invalid_poll_interval_falls_back(self):
+        for value in ('soon', None, -5, 0):
+            with mock.patch.object(config, 'current_config', {'hdd_poll_interval': value}):
+                self.assertEqual(self.poller.poll_interval(), sensor_manager.HDD_POLL_INTERVAL)
+        with mock.patch.object(config, 'current_config', {'hdd_poll_interval': '30'}):
+            self.assertEqual(self.poller.poll_interval(), 30)
+
+
+class ScanDriveSensorsTest(unittest.TestCase):
+    def test_drives_probed_in_parallel_in_order(self):
+        devices = ['/dev/sda', '/dev/sdb', '/dev/sdc']
+        # Every probe waits for all the others, so a serial scan would time out
+        barrier = threading.Barrier(len(devices), timeout=5)
+
+        def details(dev):
+            barrier.wait()
+            return {'temp': 30 + devices.index(dev), 'serial': dev[-1], 'model': None}
+
+        sensor_manager.scan_drive_sensors.cache_clear()
+        self.addCleanup(sensor_manager.scan_drive_sensors.cache_clear)
+        with mock.patch('fancontrol.sensor_manager.list_drive_devices', return_value=devices), \
+                mock.patch('fancontrol.sensor_manager.get_drive_details', side_effect=details):
+            found = sensor_manager.scan_drive_sensors()
+        self.assertEqual([(s['device'], s['value']) for s in found],
+                         [('/dev/sda', 30), ('/dev/sdb', 31), ('/dev/sdc', 32)])
+
+
+class DriveTempAttrsTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def hwmon(self, name, chip, device, entries):
+        path = os.path.join(self.root, name)
+        target = os.path.join(self.root, 'devices', device)
+        os.makedirs(target)
+        os.makedirs(path)
+        os.symlink(target, os.path.join(path, 'device'))
+        with open(os.path.join(path, 'name'), 'w') as f:
+            f.write(chip + '\n')
+        for entry in entries:
+            os.makedirs(os.path.join(path, 'device', entry))
+
+    def test_maps_drivetemp_and_nvme(self):
+        self.hwmon('hwmon0', 'drivetemp', '0:0:0:0', ['block/sda'])
+        self.hwmon('hwmon1', 'nvme', 'nvme0', ['nvme0n1', 'nvme0c0n1'])
+        self.hwmon('hwmon2', 'k10temp', '0000:00:18.3', [])
+        with mock.patch('fancontrol.sensor_manager.HWMON_ROOT', self.root):
+            attrs = sensor_manager.get_drive_temp_attrs(refresh=True)
+        self.addCleanup(sensor_manager.get_drive_temp_attrs, True)
+        self.assertEqual(attrs['/dev/sda'].path, os.path.join(self.root, 'hwmon0', 'temp1_input'))
+        # Namespace and controller, but not the multipath node
+        self.assertEqual(sorted(attrs), ['/dev/nvme0', '/dev/nvme0n1', '/dev/sda'])
+
+
+if __name__ == '__main__':
+    unittest.main()
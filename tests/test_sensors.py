@@ -0,0 +1,50 @@
+import unittest
+from unittest import mock
+
+from fancontrol import config, sensors
+
+
+class GetValsTest(unittest.TestCase):
+    def setUp(self):
+        self.cfg = {'sensors': [], 'fan_groups': [], 'drives': {'monitored': []}}
+        patches = [
+            mock.patch.object(sensors.drives, 'get_configured_drives', return_value=[]),
+            mock.patch.object(config, 'get_nvidia_group', return_value=None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_cpu_fallback_without_cpu_sensor(self):
+        self.cfg['cpu_sensor_path'] = '/sys/class/hwmon/hwmon0/temp1_input'
+        with mock.patch('fancontrol.cpu_scanner.read_temp', return_value=45.0):
+            cpu, gpu, hdd, hdd_all, gpu_fans, by_serial, values = sensors.get_vals(self.cfg)
+        self.assertEqual(cpu, 45.0)
+        self.assertIsNone(gpu)
+        self.assertEqual(values, {'cpu': 45.0})
+
+    def test_gpu_fallback_without_gpu_sensor(self):
+        group = {'id': 'gpu', 'type': 'nvidia', 'gpu_config': {'gpu_index': 0, 'fans': [0]}}
+        with mock.patch.object(config, 'get_nvidia_group', return_value=group), \
+                mock.patch('fancontrol.sensor_manager.get_gpu_temp', return_value=61.0), \
+                mock.patch.object(sensors.nvml, 'get_fan_speeds', return_value={0: {'rpm': 1500, 'pct': 40}}):
+            cpu, gpu, hdd, hdd_all, gpu_fans, by_serial, values = sensors.get_vals(self.cfg)
+        self.assertEqual(gpu, 61.0)
+        self.assertEqual(gpu_fans, {'fan0': {'rpm': 1500, 'pct': 40}})
+
+    def test_drive_sensor_reading_is_reused(self):
+        drive_sensor = {'value': 38.0, 'sources': [{'type': 'drive', 'device': '/dev/sda', 'value': 38.0}]}
+        with mock.patch('fancontrol.sensor_manager.get_all_sensor_values',
+                        return_value={'hdd1': drive_sensor}), \
+                mock.patch.object(sensors.drives, 'get_configured_drives',
+                                  return_value=[{'device': '/dev/sda', 'serial': 'S1'}]), \
+                mock.patch('fancontrol.sensor_manager.get_drive_temp') as get_drive_temp:
+            cpu, gpu, hdd, hdd_all, gpu_fans, by_serial, values = sensors.get_vals(self.cfg)
+        get_drive_temp.assert_not_called()
+        self.assertEqual(hdd, 38.0)
+        self.assertEqual(hdd_all, {'sda': 38.0})
+        self.assertEqual(by_serial, {'S1': 38.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
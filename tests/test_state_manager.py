@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+from fancontrol import state_manager
+from fancontrol.state_manager import AutoStateManager
+
+
+def make_config(thresholds, delay_up=5, hold=30):
+    return {
+        'TARGETS': {mode: 0 for mode in ('0', *thresholds)},
+        'THRESHOLDS': thresholds,
+        'DELAY_UP': delay_up,
+        'HOLD_TIME': {mode: hold for mode in thresholds},
+    }
+
+
+class ClassifierTest(unittest.TestCase):
+    def test_highest_exceeded_mode_wins(self):
+        sm = AutoStateManager(make_config({
+            '1': {'cpu': 50, 'gpu': None},
+            '2': {'cpu': 60, 'gpu': 70},
+            '3': {'cpu': 70, 'hdd1': 45.5},
+        }))
+        self.assertEqual(sm.classify({}), '0')
+        self.assertEqual(sm.classify({'cpu': 50}), '0')
+        self.assertEqual(sm.classify({'cpu': 55}), '1')
+        self.assertEqual(sm.classify({'cpu': 40, 'gpu': 75}), '2')
+        self.assertEqual(sm.classify({'cpu': 40, 'hdd1': 46}), '3')
+        self.assertEqual(sm.classify({'cpu': 90, 'gpu': 90}), '3')
+
+    def test_non_literal_limits_and_odd_sources(self):
+        sm = AutoStateManager(make_config({
+            '1': {"it's": float('inf')},
+            '2': {'x\n': 10},
+        }))
+        self.assertEqual(sm.classify({"it's": 1e308}), '0')
+        self.assertEqual(sm.classify({'x\n': 11}), '2')
+
+    def test_classifier_reused_for_same_ladder(self):
+        thresholds = {'1': {'cpu': 50}}
+        a = AutoStateManager(make_config(thresholds))
+        b = AutoStateManager(make_config(dict(thresholds)))
+        self.assertIs(a.classify, b.classify)
+        b.set_config(make_config({'1': {'cpu': 55}}))
+        self.assertIsNot(a.classify, b.classify)
+
+
+class StateMachineTest(unittest.TestCase):
+    def test_escalation_waits_for_delay_and_hold(self):
+        now = [1000.0]
+        with mock.patch.object(state_manager.time, 'time', side_effect=lambda: now[0]):
+            sm = AutoStateManager(make_config({'1': {'cpu': 50}}, delay_up=5, hold=30))
+            self.assertEqual(sm.update({'cpu': 60}), '0')
+            self.assertEqual(sm.pending_mode, '1')
+            now[0] += 5
+            self.assertEqual(sm.update({'cpu': 60}), '1')
+            now[0] += 10
+            self.assertEqual(sm.update({'cpu': 40}), '1')
+            now[0] += 20
+            self.assertEqual(sm.update({'cpu': 40}), '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from fancontrol.sysfs import SysfsAttr, list_entries
+
+
+class SysfsAttrTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'temp1_input')
+        self.write_file('45000\n')
+
+    def write_file(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+
+    def test_read_keeps_fd_open(self):
+        attr = SysfsAttr(self.path)
+        self.assertEqual(attr.read_int(), 45000)
+        fd = attr.fd
+        self.write_file('46000\n')
+        self.assertEqual(attr.read_int(), 46000)
+        self.assertEqual(attr.fd, fd)
+        attr.close()
+        self.assertIsNone(attr.fd)
+
+    def test_error_drops_fd_and_recovers(self):
+        attr = SysfsAttr(self.path)
+        self.write_file('garbage')
+        with self.assertRaises(ValueError):
+            attr.read_int()
+        self.assertIsNone(attr.fd)
+        self.write_file('47000')
+        self.assertEqual(attr.read_int(), 47000)
+
+    def test_missing_file(self):
+        attr = SysfsAttr(os.path.join(self.dir, 'nope'))
+        with self.assertRaises(OSError):
+            attr.read_int()
+
+    def test_write(self):
+        attr = SysfsAttr(self.path, writable=True)
+        attr.write(128)
+        with open(self.path) as f:
+            self.assertEqual(f.read(2), '12')
+
+    def test_concurrent_reads_and_errors(self):
+        attr = SysfsAttr(self.path)
+        errors = []
+
+        def reader():
+            for _ in range(500):
+                try:
+                    attr.read_int()
+                except ValueError:
+                    pass
+                except OSError as e:
+                    errors.append(e)
+
+        def flipper():
+            for i in range(200):
+                self.write_file('bad' if i % 2 else '45000')
+        threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=flipper)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        attr.close()
+
+
+class ListEntriesTest(unittest.TestCase):
+    def test_filters_and_sorts(self):
+        d = tempfile.mkdtemp()
+        for name in ('temp2_input', 'temp1_input', 'temp1_label', 'fan1_input'):
+            open(os.path.join(d, name), 'w').close()
+        self.assertEqual([os.path.basename(p) for p in list_entries(d, 'temp', '_input')],
+                         ['temp1_input', 'temp2_input'])
+        self.assertEqual(list_entries(os.path.join(d, 'missing')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()